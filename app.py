@@ -1,27 +1,19 @@
 import streamlit as st
-import zipfile
-import tempfile
+import io
 import os
-import shutil
-import subprocess
-import pandas as pd
-import geopandas as gpd
-import joblib
-import glob
-import sys
+import time
 import base64
+import threading
 from pathlib import Path
 import streamlit.components.v1 as components
+import profil
 
+# pandas, Geodaten- und ML-Module (batch, modell, ...) werden erst bei Bedarf importiert:
+# die Startseite soll ohne sie sofort erscheinen
 
-# --- Einstellungen & Hinweise
 
-st.set_page_config(
-    page_title="Die Digitale Jury",
-    layout="centered"
-)
-st.title("Die Digitale Jury – objektive Bewertung städtebaulicher Entwürfe")
-st.markdown("""
+# --- Einstellungen & Hinweise
+EINLEITUNG = """
 ######
 Willkommen bei der **digitalen Jury**!  
 Das Tool ermöglicht die automatische Bewertung städtebaulicher Entwürfe anhand von **13 definierten Kriterien**. Grundlage bildet ein **trainiertes Random-Forest-Modell**, das die Bewertung datenbasiert vornimmt.
@@ -49,6 +41,7 @@ Die **Layer-Namen**, **Spalten-Namen** und **Attributwerte** müssen **exakt** s
 Alle Dateien müssen in einem einheitlichen **Koordinatensystem** vorliegen.
 Achte darauf, dass sich die Geometrien innerhalb des Bewertungsgebiets **nicht überschneiden oder mehrfach vorkommen**.
 Überlagerungen, sowohl innerhalb eines Layers als auch zwischen verschiedenen Layern, können zu fehlerhaften Berechnungen führen, beispielsweise durch doppelt gezählte Flächenanteile oder unklare Abgrenzungen.
+Gefundene Überlappungen und ungültige Geometrien werden gemeldet; auf Wunsch werden sie vor der Bewertung automatisch bereinigt.
 
 Verwende **korrekte, vollständige Geometrien** – leere oder fehlerhafte Layer führen zu unvollständigen Ergebnissen.
 Wenn ein Layer oder Attribut fehlt oder falsch benannt ist, kann das entsprechende Kriterium **nicht berechnet werden** und wird automatisch mit `0` bewertet.
@@ -72,49 +65,23 @@ Bitte stelle sicher, dass deine ZIP-Datei folgende Layer enthält (sofern vorhan
 | `Bestandsgruen.shp` | – | 
 | `Gebietsabgrenzung.shp` | – | 
 
-""")
-
-# --- Kriterien-Handbuch (PDF) nach Layerstruktur anzeigen 
-st.markdown("---")
-st.subheader("Handbuch-Kriterien (Download & Vorschau)")
+"""
 
-st.markdown("""
+# --- Kriterien-Handbuch (PDF) nach Layerstruktur anzeigen
+HANDBUCH = """
 Das **Handbuch-Kriterien** erläutert alle **13 Bewertungs­kriterien** der Digitalen Jury im Detail.  
 Es beschreibt, **wie jedes Kriterium berechnet** bzw. **bemessen** wird, welche Daten aus den **GIS-Layern** benötigt werden und worauf bei der **Vorbereitung der Entwurfsdaten** zu achten ist. Somit kann das Handbuch als Orientierung bei der **Datenaufbereitung in GIS**,  
 zur **Nachvollziehbarkeit der automatischen Bewertung** sowie als **Hilfestellung für die Interpretation der Ergebnisse** dienen.
-""")
-
-DEFAULT_PDF_PATH = Path("assets/Handbuch-Kriterien.pdf")
+"""
 
-if DEFAULT_PDF_PATH.exists():
-    pdf_bytes = DEFAULT_PDF_PATH.read_bytes()
-
-    # --- Download-Button
-    st.download_button(
-        label="Handbuch-Kriterien herunterladen",
-        data=pdf_bytes,
-        file_name="Handbuch-Kriterien.pdf",
-        mime="application/pdf",
-        use_container_width=True
-    )
-else:
-    st.warning("Handbuch-Kriterien konnte nicht gefunden werden.")
-st.markdown("---")
-
-st.markdown("""
+HOCHLADEN = """
 ### **Hochladen**
 
 Nutze das Upload-Feld unten, um deine **ZIP-Datei** hochzuladen.  
 Du kannst auch **mehrere ZIPs gleichzeitig** hochladen, um Entwürfe direkt zu vergleichen.
-""")
-
-uploaded_files = st.file_uploader(
-    "Entwürfe als ZIP hochladen",
-    type="zip",
-    accept_multiple_files=True
-)
+"""
 
-st.markdown("""
+ERGEBNIS_HINWEIS = """
 
 ---
 
@@ -123,163 +90,368 @@ st.markdown("""
 Nach der automatischen Bewertung kannst du:
 - alle berechneten Kriterien und die Sternebewertung einsehen
 - die Ergebnisse als **Excel-Datei herunterladen**
-""")
+"""
 
+DEFAULT_PDF_PATH = Path("assets/Handbuch-Kriterien.pdf")
 
-MODEL_PATH = "final_RF_model.pkl"
-try:
-    bundle = joblib.load(MODEL_PATH)
-    if isinstance(bundle, dict) and "model" in bundle and "features" in bundle:
-        rf_model = bundle["model"]
-        FEATURE_ORDER = list(bundle["features"])
-    else:
-        rf_model = bundle
-        # Fallback: exakt die Reihenfolge, mit der du trainiert hast
-        FEATURE_ORDER = ["K002","K003","K004","K005","K006","K007","K008","K009","K010","K011","K012","K013","K015"]
-except Exception as e:
-    st.error(f"Bewertungsmodell konnte nicht geladen werden: {e}")
-    st.stop()
 
-FEATURE_ORDER = list(getattr(rf_model, "feature_names_in_", FEATURE_ORDER))
+# --- Einmal pro Serverprozess laden (für alle Sitzungen geteilt);
+# die Änderungszeit im Cache-Schlüssel sorgt für Neuladen nach einem Update der Datei
+@st.cache_resource(max_entries=1, show_spinner=False)
+def lade_pdf(pfad, mtime):
+    return Path(pfad).read_bytes()
 
-# --- Verarbeitung
-if uploaded_files:
-    for zip_file in uploaded_files:
-        st.write(f"Hochgeladen: `{zip_file.name}`")
-        with st.spinner("Verarbeite Entwurf ..."):
-            with tempfile.TemporaryDirectory() as tmpdir:
-                # --- Entpacken
-                with zipfile.ZipFile(zip_file, "r") as zip_ref:
-                    zip_ref.extractall(tmpdir)
-                # --- Erwartete Layer prüfen (einmalige Sammelmeldung) ---
-                erwartete_layer = [
-                    "Gebaeude.shp","Gebaeude_Umgebung.shp","Verkehrsflaechen.shp","Verkehrsmittellinie.shp",
-                    "Dachgruen.shp","PV_Anlage.shp","oeffentliche_Gruenflaechen.shp","private_Gruenflaechen.shp",
-                    "oeffentliche_Plaetze.shp","Wasser.shp","Baeume_Entwurf.shp","Bestandsbaeume.shp",
-                    "Bestandsgruen.shp","Gebietsabgrenzung.shp"
-                ]
-                
-                missing_layers = [ly for ly in erwartete_layer if not os.path.exists(os.path.join(tmpdir, ly))]
-                if missing_layers:
-                    st.warning("Fehlende Layer: " + ", ".join(missing_layers))
-                
-                # --- Attribut-Checks
-                erwartete_attributs = {
-                    "Verkehrsflaechen": ["Nutzung"],
-                    "Gebaeude": ["Geb_Hoehe"],
-                    "oeffentliche_Gruenflaechen": ["Nutzung"],
-                }
-                
-                for layer_name, attrs in erwartete_attributs.items():
-                    shp_path = os.path.join(tmpdir, f"{layer_name}.shp")
-                
-                    
-                    if not os.path.exists(shp_path):
-                        continue
-                
-                    try:
-                        layer = gpd.read_file(shp_path)
-                    except Exception as e:
-                        st.warning(f"`{layer_name}.shp` konnte nicht gelesen werden: {e}")
-                        continue
-                
-                    missing_attrs_in_layer = [a for a in attrs if a not in layer.columns]
-                    if missing_attrs_in_layer:
-                        st.warning(
-                            f"In `{layer_name}.shp` fehlen folgende Attribute: {', '.join(missing_attrs_in_layer)}"
-                        )
-
-                # --- Berechnungsskript starten
-                try:
-                    shutil.copy("shpVerknuepfung.py", tmpdir)
-                except Exception as e:
-                    st.error(f"`shpVerknuepfung.py` konnte nicht in das Temp-Verzeichnis kopiert werden: {e}")
-                    st.stop()
-
-                result = subprocess.run(
-                    [sys.executable, "shpVerknuepfung.py", tmpdir],
-                    cwd=tmpdir,
-                    capture_output=True,
-                    text=True
-                )
-                # --- Log anzeigen 
-                if result.returncode != 0:
-                    st.error("Fehler beim Ausführen von shpVerknuepfung.py")
-                    if result.stderr:
-                        with st.expander("Fehlerdetails (stderr)"):
-                            st.code(result.stderr)
-                    if result.stdout:
-                        with st.expander("Ausgabe (stdout)"):
-                            st.code(result.stdout)
-                    st.stop()
-                else:
-                    if result.stderr:
-                        with st.expander("Log aus shpVerknuepfung.py"):
-                            st.code(result.stderr)
-
-                # --- Ergebnisse einlesen
-                kriterien_path = os.path.join(tmpdir, "Kriterien_Ergebnisse.xlsx")
-                if not os.path.exists(kriterien_path):
-                    st.error("Bewertungsmatrix wurde nicht erstellt (Kriterien_Ergebnisse.xlsx fehlt).")
-                    if result.stdout:
-                        with st.expander("Ausgabe (stdout)"):
-                            st.code(result.stdout)
-                    st.stop()
-
-                try:
-                    df_raw = pd.read_excel(kriterien_path)
-                except Exception as e:
-                    st.error(f"Kriterien_Ergebnisse.xlsx konnte nicht gelesen werden: {e}")
-                    st.stop()
-
-                # --- Sichert Feature-Matrix 
-                X = pd.DataFrame({f: pd.to_numeric(df_raw.get(f), errors="coerce") for f in FEATURE_ORDER})
-                X = X.fillna(0.0).astype(float)
-
-                # --- Vorhersage
-                try:
-                    y_hat = rf_model.predict(X)[0]
-                    sterne = int(y_hat)
-                except Exception as e:
-                    st.error(f"Vorhersage fehlgeschlagen: {e}")
-                    st.stop()
-
-                st.success(f"⭐️ Bewertung: **{sterne} Sterne**")
-
-                # --- Werte anzeigen
-                NAMEN = {
-                    "K002":"Zukunftsfähige Mobilität", "K003":"Anteil Grünflächen",
-                    "K004":"Einbettung Umgebung", "K005":"Lärmschutz",
-                    "K006":"Erhalt Bestandgebäude", "K007":"PV-Anteil",
-                    "K008":"Nutzungsvielfalt Freiflächen", "K009":"Zugang Wasser",
-                    "K010":"Entsiegelung", "K011":"Rettungswege",
-                    "K012":"Dachbegrünung", "K013":"Erhalt Baumbestand",
-                    "K015":"Zonierung Freiflächen"
-                }
-                df_show = X.iloc[[0]].T.reset_index()
-                df_show.columns = ["Kriterium", "Wert"]
-                df_show["Kriterium"] = df_show["Kriterium"].map(NAMEN).fillna(df_show["Kriterium"])
-                st.dataframe(df_show, hide_index=True)
-
-                # --- Download
-                out = X.copy()
-                out.columns = [NAMEN.get(c, c) for c in out.columns]
-                out["Anzahl Sterne"] = sterne
-                output_path = os.path.join(tmpdir, f"Bewertung_{zip_file.name}.xlsx")
-                out.to_excel(output_path, index=False)
-                with open(output_path, "rb") as f:
-                    st.download_button(
-                        "Ergebnis als Excel herunterladen",
-                        data=f,
-                        file_name=f"Bewertung_{zip_file.name}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def lade_modell(pfad, mtime):
+    import modell
+    rf_model, feature_order = modell.lade_modell(pfad)
+    return rf_model, feature_order, modell.modell_version(pfad)
+
+
+def bewertungsmodell():
+    """``(rf_model, feature_order, version)``; geladen erst beim ersten Upload oder beim Aufwärmen."""
+    import modell
+    return lade_modell(modell.MODEL_PATH, os.path.getmtime(modell.MODEL_PATH))
+
+
+# Nach der ersten Seite Module und Modell im Hintergrund vorladen (JURY_AUFWAERMEN=0 schaltet ab)
+AUFWAERMEN = os.environ.get("JURY_AUFWAERMEN", "1") != "0"
 
 
+@st.cache_resource(show_spinner=False)
+def aufwaermen():
+    """Startet einmal pro Serverprozess einen Thread, der die schweren Importe und das Modell vorlädt."""
+    def vorladen():
+        try:
+            import altair, batch, auftraege, ergebnis_cache, sensitivitaet  # noqa: F401
+            bewertungsmodell()
+        except Exception:
+            pass  # Fehler meldet dann der erste Upload
 
+    thread = threading.Thread(target=vorladen, name="jury-aufwaermen", daemon=True)
+    thread.start()
+    return thread
 
 
+NAMEN = {
+    "K002":"Zukunftsfähige Mobilität", "K003":"Anteil Grünflächen",
+    "K004":"Einbettung Umgebung", "K005":"Lärmschutz",
+    "K006":"Erhalt Bestandgebäude", "K007":"PV-Anteil",
+    "K008":"Nutzungsvielfalt Freiflächen", "K009":"Zugang Wasser",
+    "K010":"Entsiegelung", "K011":"Rettungswege",
+    "K012":"Dachbegrünung", "K013":"Erhalt Baumbestand",
+    "K015":"Zonierung Freiflächen"
+}
+
+
+# --- Was-wäre-wenn-Analyse
+def zeige_was_waere_wenn(ergebnis, sterne):
+    import altair as alt
+    import modell
+    import sensitivitaet
+
+    rf_model, feature_order, _ = bewertungsmodell()
+    kriterien = ergebnis["kriterien"]
+    name = ergebnis["name"]
+    ziel = sterne + 1
+    if ziel > max(int(k) for k in rf_model.classes_):
+        st.info("Der Entwurf hat bereits die höchste Bewertung.")
+        return
+
+    # Einzelne Kriterien: alle Variationen in einem Modellaufruf
+    einzeln = sensitivitaet.naechster_stern(rf_model, feature_order, kriterien, ziel_sterne=ziel)
+    if einzeln.empty:
+        st.caption(f"Kein einzelnes Kriterium reicht allein für {ziel} Sterne.")
+    else:
+        st.markdown(f"**Kleinste Änderung eines einzelnen Kriteriums für {ziel} Sterne**")
+        st.dataframe(
+            einzeln.assign(Kriterium=einzeln["Kriterium"].map(NAMEN).fillna(einzeln["Kriterium"]))
+                   .rename(columns={"Aenderung": "Änderung (normiert)"}),
+            hide_index=True
+        )
+
+    # Kombination von bis zu zwei Kriterien
+    auswahl = st.multiselect(
+        "Kriterien variieren (max. 2)", list(sensitivitaet.WERTEBEREICHE),
+        default=["K012", "K007"], max_selections=2,
+        format_func=lambda k: f"{k} – {NAMEN.get(k, k)}", key=f"wenn_auswahl_{name}"
+    )
+    if not auswahl:
+        return
+    schritte = st.slider("Auflösung stetiger Kriterien", 5, 101, sensitivitaet.STANDARD_SCHRITTE,
+                         step=4, key=f"wenn_schritte_{name}")
+    tabelle = sensitivitaet.was_waere_wenn(rf_model, feature_order, kriterien, auswahl, schritte)
+
+    if len(auswahl) == 1:
+        st.line_chart(tabelle.set_index(auswahl[0])[["Sterne"]])
+    else:
+        st.altair_chart(
+            alt.Chart(tabelle).mark_rect().encode(
+                x=alt.X(f"{auswahl[0]}:O", title=NAMEN.get(auswahl[0], auswahl[0])),
+                y=alt.Y(f"{auswahl[1]}:O", title=NAMEN.get(auswahl[1], auswahl[1]), sort="descending"),
+                color=alt.Color("Sterne:O", scale=alt.Scale(scheme="yellowgreenblue")),
+                tooltip=auswahl + ["Sterne", alt.Tooltip("Konfidenz:Q", format=".0%")],
+            ),
+            use_container_width=True
+        )
+
+    beste = sensitivitaet.kleinste_aenderung(tabelle, ziel)
+    if beste is None:
+        st.caption(f"{ziel} Sterne sind mit diesen Kriterien allein nicht erreichbar.")
+    else:
+        X = modell.feature_matrix([kriterien], feature_order).iloc[0]
+        aenderungen = ", ".join(f"{NAMEN.get(k, k)} {X[k]:g} → {beste[k]:g}" for k in auswahl if beste[k] != X[k])
+        st.caption(f"Kleinste Änderung für {int(beste['Sterne'])} Sterne: {aenderungen} "
+                   f"(Konfidenz {beste['Konfidenz']:.0%})")
+
+
+# --- Ergebnis eines Entwurfs darstellen
+def zeige_ergebnis(ergebnis, vorhersage_fehler=None):
+    import pandas as pd
+    import modell
+
+    for hinweis in ergebnis["hinweise"]:
+        st.warning(hinweis)
+
+    if ergebnis["fehler"]:
+        st.error(f"Fehler bei der Berechnung der Kriterien: {ergebnis['fehler']}")
+        return
+
+    if ergebnis["log"]:
+        with st.expander("Log der Kriterienberechnung"):
+            st.code("\n".join(ergebnis["log"]))
+
+    # --- Sichert Feature-Matrix 
+    _, feature_order, _ = bewertungsmodell()
+    X = modell.feature_matrix([ergebnis["kriterien"]], feature_order)
+
+    # --- Vorhersage (gemeinsam für alle Uploads berechnet)
+    sterne = ergebnis["sterne"]
+    if sterne is None:
+        st.error(f"Vorhersage fehlgeschlagen: {vorhersage_fehler}")
+        return
+
+    st.success(f"⭐️ Bewertung: **{sterne} Sterne**")
+    bewertung = ergebnis["bewertung"]
+    if bewertung is not None:
+        text = f"Konfidenz {bewertung['Konfidenz']:.0%}"
+        if bewertung["Knapp"]:
+            text += f" – knappe Entscheidung, {bewertung['Alternative']} Sterne ähnlich wahrscheinlich"
+        st.caption(text)
+    if ergebnis["aus_cache"]:
+        st.caption(f"Ergebnis aus dem Cache (identischer Entwurf bereits bewertet, {ergebnis['dauer']:.1f} s)")
+    else:
+        st.caption(f"Berechnet in {ergebnis['dauer']:.1f} s")
+    if ergebnis["wiederverwendet"]:
+        st.caption(
+            f"{len(ergebnis['wiederverwendet'])} von {len(NAMEN)} Kriterien aus einer früheren Version "
+            "übernommen (Eingabe-Layer unverändert)"
+        )
+
+    # --- Werte anzeigen
+    df_show = X.iloc[[0]].T.reset_index()
+    df_show.columns = ["Kriterium", "Wert"]
+    df_show["Kriterium"] = df_show["Kriterium"].map(NAMEN).fillna(df_show["Kriterium"])
+    st.dataframe(df_show, hide_index=True)
+
+    # --- Blockierte Rettungswege (K011)
+    konflikte = ergebnis["rettungsweg_konflikte"]
+    if konflikte:
+        with st.expander(f"Rettungswege: {len(konflikte)} blockierte Stelle(n)"):
+            df_konflikte = pd.DataFrame(konflikte)
+            if "lat" in df_konflikte.columns:
+                st.map(df_konflikte, latitude="lat", longitude="lon", size=5)
+            st.dataframe(
+                df_konflikte.rename(columns={
+                    "segment": "Mittellinie (ID)", "layer": "Hindernis-Layer",
+                    "id": "Hindernis (ID)", "flaeche_m2": "Überlappung [m²]"
+                }),
+                hide_index=True
+            )
+
+    # --- Stimmverteilung der Entscheidungsbäume
+    if bewertung is not None:
+        with st.expander("Stimmverteilung des Modells"):
+            klassen = [s.split("_")[1] for s in bewertung if s.startswith("Stimmen_")]
+            st.dataframe(pd.DataFrame({
+                "Sterne": klassen,
+                "Stimmen (Bäume)": [bewertung[f"Stimmen_{k}"] for k in klassen],
+                "Wahrscheinlichkeit": [round(bewertung[f"P_{k}"], 3) for k in klassen],
+            }), hide_index=True)
+
+    # --- Geometrie-Prüfung
+    geometrie = ergebnis["geometrie"]
+    if geometrie is not None and geometrie["ueberlappungen"]:
+        with st.expander(f"Überlappende Flächen: {len(geometrie['ueberlappungen'])} Layerpaar(e)"):
+            st.dataframe(
+                pd.DataFrame(geometrie["ueberlappungen"]).rename(columns={
+                    "layer_a": "Layer", "layer_b": "überlappt mit", "paare": "Feature-Paare",
+                    "flaeche_m2": "Überlappung [m²]"
+                }),
+                hide_index=True
+            )
+
+    # --- Was wäre wenn?
+    with st.expander("Was wäre wenn? – Sensitivität der Bewertung"):
+        zeige_was_waere_wenn(ergebnis, sterne)
+
+    # --- Laufzeitprofil
+    laufzeit = ergebnis["profil"]
+    with st.expander(f"Laufzeitprofil ({laufzeit.gesamtdauer():.2f} s)"):
+        st.dataframe(pd.DataFrame(laufzeit.stufen), hide_index=True)
+        st.download_button(
+            "Profil als JSON herunterladen",
+            data=laufzeit.als_json(indent=2),
+            file_name=f"Profil_{ergebnis['name']}.json",
+            mime="application/json"
+        )
+
+    # --- Download
+    out = X.copy()
+    out.columns = [NAMEN.get(c, c) for c in out.columns]
+    out["Anzahl Sterne"] = sterne
+    if bewertung is not None:
+        out["Konfidenz"] = bewertung["Konfidenz"]
+    puffer = io.BytesIO()
+    out.to_excel(puffer, index=False)
+    st.download_button(
+        "Ergebnis als Excel herunterladen",
+        data=puffer.getvalue(),
+        file_name=f"Bewertung_{ergebnis['name']}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+
+# --- Verarbeitung
+# Abfrageintervall laufender Aufträge [s]
+AKTUALISIERUNG = 0.5
+
+
+@st.cache_resource(show_spinner=False)
+def hintergrund_auftraege():
+    import batch
+    import auftraege
+    return auftraege.Auftraege(batch.MAX_WORKERS)
+
+
+def verarbeite(uploaded_files, bereinigen):
+    """Bewertet die hochgeladenen Entwürfe im Hintergrund und zeigt fertige Ergebnisse an."""
+    import batch
+    import ergebnis_cache
+
+    try:
+        # meist schon durch das Aufwärmen geladen
+        with st.spinner("Lade Bewertungsmodell ..."):
+            rf_model, feature_order, modell_version = bewertungsmodell()
+    except Exception as e:
+        st.error(f"Bewertungsmodell konnte nicht geladen werden: {e}")
+        st.stop()
+
+    try:
+        cache = ergebnis_cache.ErgebnisCache(modell_version)
+    except Exception:
+        cache = None  # ohne Cache weiterrechnen, z. B. bei schreibgeschütztem Temp-Verzeichnis
+
+    # Aufträge laufen im Hintergrund weiter; ein Rerun hängt sich an bestehende an.
+    # Schlüssel je Upload merken, damit nicht jede Abfrage die Datei kopiert und hasht
+    jobs = hintergrund_auftraege()
+    bekannt = st.session_state.setdefault("auftrag_schluessel", {})
+    schluessel = []
+    for zip_file in uploaded_files:
+        kennung = (zip_file.file_id, bereinigen, modell_version)
+        if kennung not in bekannt or not jobs.vorhanden(bekannt[kennung]):
+            bekannt[kennung] = jobs.starte(zip_file.name, zip_file.getvalue(), cache=cache,
+                                           speicher=profil.SPEICHER_STANDARD, bereinigen=bereinigen,
+                                           modell_version=modell_version)
+        schluessel.append(bekannt[kennung])
+    ergebnisse = [jobs.ergebnis(s) for s in schluessel]
+
+    # Eine gemeinsame Vorhersage für alle seit der letzten Abfrage fertigen Uploads
+    # statt eines Modellaufrufs je Entwurf; bereits bewertete werden übersprungen
+    vorhersage_fehler = None
+    fertig = [s for s, e in zip(schluessel, ergebnisse) if e is not None]
+    if fertig:
+        try:
+            jobs.sage_voraus(fertig, rf_model, feature_order, cache,
+                             profil.Profil(speicher=profil.SPEICHER_STANDARD))
+        except Exception as e:
+            vorhersage_fehler = e
+
+    # Fertige Entwürfe sofort anzeigen, für die übrigen den Fortschritt (in Upload-Reihenfolge)
+    for zip_file, s, ergebnis in zip(uploaded_files, schluessel, ergebnisse):
+        st.write(f"Hochgeladen: `{zip_file.name}`")
+        if ergebnis is None:
+            anteil, stufe = jobs.stand(s)
+            st.progress(anteil, text=f"Verarbeite Entwurf ... {NAMEN.get(stufe, stufe)}")
+        else:
+            zeige_ergebnis(ergebnis, vorhersage_fehler)
+
+    if len(fertig) < len(schluessel):
+        # laufende Aufträge erneut abfragen
+        time.sleep(AKTUALISIERUNG)
+        st.rerun()
+
+    if len(ergebnisse) > 1:
+        bericht = batch.laufzeit_bericht(ergebnisse, jobs.laufzeit(schluessel), jobs.max_workers)
+        st.caption(
+            f"{bericht['entwuerfe']} Entwürfe in {bericht['gesamtdauer']:.1f} s bewertet "
+            f"({bericht['prozesse']} Prozesse, seriell ca. {bericht['seriell_geschaetzt']:.1f} s, "
+            f"Speedup ×{bericht['speedup']:.1f})"
+        )
+
+
+def main():
+    st.set_page_config(
+        page_title="Die Digitale Jury",
+        layout="centered"
+    )
+    st.title("Die Digitale Jury – objektive Bewertung städtebaulicher Entwürfe")
+    st.markdown(EINLEITUNG)
+
+    # --- Kriterien-Handbuch (PDF) nach Layerstruktur anzeigen
+    st.markdown("---")
+    st.subheader("Handbuch-Kriterien (Download & Vorschau)")
+    st.markdown(HANDBUCH)
+    if DEFAULT_PDF_PATH.exists():
+        pdf_bytes = lade_pdf(str(DEFAULT_PDF_PATH), DEFAULT_PDF_PATH.stat().st_mtime)
+
+        # --- Download-Button
+        st.download_button(
+            label="Handbuch-Kriterien herunterladen",
+            data=pdf_bytes,
+            file_name="Handbuch-Kriterien.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+    else:
+        st.warning("Handbuch-Kriterien konnte nicht gefunden werden.")
+    st.markdown("---")
+
+    st.markdown(HOCHLADEN)
+    uploaded_files = st.file_uploader(
+        "Entwürfe als ZIP hochladen",
+        type="zip",
+        accept_multiple_files=True
+    )
+    bereinigen = st.checkbox(
+        "Geometrien automatisch bereinigen",
+        help="Repariert ungültige Geometrien, entfernt leere und vereinigt überlappende Flächen gleicher Nutzung "
+             "innerhalb eines Layers, bevor die Kriterien berechnet werden. Überlappungen zwischen Layern "
+             "werden nur gemeldet."
+    )
 
+    st.markdown(ERGEBNIS_HINWEIS)
 
+    if uploaded_files:
+        verarbeite(uploaded_files, bereinigen)
+    elif AUFWAERMEN:
+        # Startseite ist fertig gerendert: Importe und Modell für den ersten Upload vorladen
+        aufwaermen()
 
 
+# Streamlit führt die Seite als __main__ aus. Die "spawn"-Prozesse der Hintergrund-Aufträge
+# (Worker und Manager) importieren dieses Skript erneut als __mp_main__ und sollen dabei
+# weder rendern noch aufwärmen.
+if __name__ == "__main__":
+    main()
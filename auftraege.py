@@ -0,0 +1,210 @@
+import math
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import batch
+import shpVerknuepfung as kriterien_engine
+
+
+# Erwartete Stufen eines Entwurfs: Öffnen, Cache-Abfrage, jeder Layer, jedes Kriterium,
+# Geometrie- und Attribut-Prüfung
+STUFEN_GESAMT = 4 + len(kriterien_engine.layer_namen) + len(kriterien_engine.KRITERIEN)
+
+# So viele abgeschlossene Aufträge bleiben für spätere Reruns erhalten
+MAX_ERLEDIGT = 200
+
+# So oft wird ein Auftrag nach einem Absturz seines Worker-Prozesses neu gestartet
+MAX_NEUSTARTS = 2
+
+
+class Fortschritt:
+    """Picklebarer Beobachter für ``Profil``: meldet die aktuelle Stufe an den Hauptprozess."""
+
+    def __init__(self, stand, schluessel):
+        self.stand = stand
+        self.schluessel = schluessel
+        self.anzahl = 0
+
+    def __call__(self, stufe, art):
+        self.anzahl += 1
+        try:
+            self.stand[self.schluessel] = {"stufe": stufe, "art": art, "anzahl": self.anzahl}
+        except Exception:
+            pass  # Fortschrittsanzeige ist optional
+
+
+class Auftraege:
+    """Hintergrund-Aufträge für die Bewertung hochgeladener Entwürfe.
+
+    Jeder Upload wird über den Hash aus Dateiname, Inhalt und Modellversion
+    identifiziert; nach einem Modellwechsel werden Entwürfe daher neu bewertet
+    statt mit den Sternen des alten Modells angezeigt.
+    ``starte`` legt einen Auftrag nur an, wenn es ihn noch nicht gibt; ein
+    Rerun der Streamlit-Seite (oder eine zweite Sitzung mit derselben Datei)
+    hängt sich damit an den laufenden Auftrag an, statt ihn neu zu starten.
+    Die Worker-Prozesse melden ihre aktuelle Stufe über ein
+    ``multiprocessing.Manager``-Dictionary; ``stand`` liefert daraus den
+    Fortschritt für die Oberfläche.
+
+    Stürzt ein Worker-Prozess ab (Speichermangel, Segfault), ist der ganze
+    Pool unbrauchbar und alle offenen Aufträge enden mit ``BrokenProcessPool``.
+    Der nächste ``starte``-Aufruf baut Pool und Manager neu auf und startet
+    so betroffene Aufträge erneut (höchstens ``MAX_NEUSTARTS``-mal je Upload).
+
+    Ein Objekt wird pro Serverprozess angelegt (``st.cache_resource``) und von
+    allen Sitzungen geteilt.
+    """
+
+    def __init__(self, max_workers=batch.MAX_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self._lock = threading.Lock()
+        self._auftraege = {}
+        self._pool = None
+        self._manager = None
+        self._stand = None
+
+    def _starte_pool(self):
+        if self._pool is None:
+            # "spawn" statt "fork": der Streamlit-Server läuft mit mehreren Threads
+            ctx = multiprocessing.get_context("spawn")
+            self._manager = ctx.Manager()
+            self._stand = self._manager.dict()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+
+    def _beende_pool(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            self._manager.shutdown()
+        except Exception:
+            pass
+        self._pool = self._manager = self._stand = None
+
+    @staticmethod
+    def _abgestuerzt(auftrag):
+        future = auftrag["future"]
+        return future.done() and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+
+    @staticmethod
+    def schluessel(name, daten, bereinigen=False, modell_version=None):
+        h = hashlib.sha256(name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(daten)
+        if bereinigen:
+            h.update(b"\0bereinigt")
+        if modell_version is not None:
+            h.update(f"\0{modell_version}".encode())
+        return h.hexdigest()
+
+    def _neustarts(self, schluessel):
+        """Bisherige Neustarts, falls der Auftrag (neu) gestartet werden muss, sonst ``None``."""
+        auftrag = self._auftraege.get(schluessel)
+        if auftrag is None:
+            return 0
+        abgestuerzt = self._abgestuerzt(auftrag)
+        neustarts = auftrag["neustarts"] + abgestuerzt
+        if auftrag["future"].cancelled() or (abgestuerzt and neustarts <= MAX_NEUSTARTS):
+            return neustarts
+        auftrag["zugriff"] = time.time()
+        return None
+
+    def vorhanden(self, schluessel):
+        """Ob der Auftrag besteht und nicht neu gestartet werden muss (ohne die Upload-Daten erneut zu hashen)."""
+        with self._lock:
+            return self._neustarts(schluessel) is None
+
+    def starte(self, name, daten, cache=None, speicher=False, bereinigen=False, modell_version=None):
+        """Startet die Bewertung eines Uploads (falls nicht schon vorhanden) und liefert dessen Schlüssel."""
+        schluessel = self.schluessel(name, daten, bereinigen, modell_version)
+        with self._lock:
+            neustarts = self._neustarts(schluessel)
+            if neustarts is None:
+                return schluessel
+
+            for versuch in range(2):
+                self._starte_pool()
+                self._stand[schluessel] = {"stufe": "Warteschlange", "art": "stufe", "anzahl": 0}
+                try:
+                    future = self._pool.submit(batch.bewerte_entwurf, name, daten, cache, speicher,
+                                               Fortschritt(self._stand, schluessel), bereinigen=bereinigen)
+                    break
+                except BrokenProcessPool:
+                    # abgestürzter Worker: Pool und Manager neu aufbauen
+                    self._beende_pool()
+                    if versuch:
+                        raise
+            auftrag = {"name": name, "future": future, "ende": None,
+                       "zugriff": time.time(), "neustarts": neustarts}
+            future.add_done_callback(lambda f, a=auftrag: a.update(ende=time.time()))
+            self._auftraege[schluessel] = auftrag
+            self._aufraeumen()
+        return schluessel
+
+    def _aufraeumen(self):
+        erledigt = sorted((a["zugriff"], s) for s, a in self._auftraege.items() if a["future"].done())
+        for _, s in erledigt[:max(0, len(erledigt) - MAX_ERLEDIGT)]:
+            del self._auftraege[s]
+            self._stand.pop(s, None)
+
+    def stand(self, schluessel):
+        """``(anteil, stufe)`` eines laufenden Auftrags für Fortschrittsbalken."""
+        try:
+            stand = self._stand.get(schluessel) or {}
+        except Exception:
+            stand = {}
+        anteil = min(stand.get("anzahl", 0) / STUFEN_GESAMT, 0.99)
+        return anteil, stand.get("stufe", "")
+
+    def ergebnis(self, schluessel):
+        """Ergebnis-Dictionary (wie ``batch.bewerte_entwurf``) oder ``None``, solange der Auftrag läuft."""
+        auftrag = self._auftraege[schluessel]
+        future = auftrag["future"]
+        if not future.done():
+            return None
+        if "ergebnis" not in auftrag:
+            try:
+                auftrag["ergebnis"] = future.result()
+            except Exception as e:
+                # z. B. abgestürzter Worker-Prozess
+                auftrag["ergebnis"] = batch.fehler_ergebnis(auftrag["name"], e)
+        return auftrag["ergebnis"]
+
+    def laufzeit(self, schluessel_liste):
+        """Wandzeit, in der mindestens einer der abgeschlossenen Aufträge gerechnet hat.
+
+        Gezählt wird die Vereinigung der Rechenzeiten (Ende minus ``"dauer"``
+        des Ergebnisses), nicht die Spanne vom ersten Start bis zum letzten
+        Ende: Aufträge bleiben über Reruns und Sitzungen erhalten, später
+        hinzugekommene oder fremde Aufträge liefen also nicht gleichzeitig,
+        und Wartezeit auf den Pool ist keine Rechenzeit.
+        """
+        intervalle = []
+        for s in schluessel_liste:
+            auftrag = self._auftraege[s]
+            ergebnis = self.ergebnis(s)
+            if ergebnis is None or math.isnan(ergebnis["dauer"]):
+                continue
+            # "ende" wird vom Done-Callback gesetzt, der kurz nach dem Ergebnis laufen kann
+            ende = auftrag["ende"] or time.time()
+            intervalle.append((ende - ergebnis["dauer"], ende))
+
+        gesamt, bis = 0.0, -math.inf
+        for von, ende in sorted(intervalle):
+            gesamt += max(0.0, ende - max(von, bis))
+            bis = max(bis, ende)
+        return gesamt
+
+    def sage_voraus(self, schluessel_liste, rf_model, feature_order, cache=None, profil=None):
+        """Gemeinsame Vorhersage für alle noch unbewerteten, abgeschlossenen Aufträge (idempotent)."""
+        with self._lock:
+            offen = [e for e in (self.ergebnis(s) for s in schluessel_liste)
+                     if e is not None and e["kriterien"] is not None and e["bewertung"] is None]
+            if offen:
+                batch.sage_voraus(offen, rf_model, feature_order, cache, profil)
+                if profil is not None:
+                    for e in offen:
+                        e["profil"].stufen.extend(profil.stufen)
+            return offen
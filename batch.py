@@ -0,0 +1,389 @@
+import os
+import sys
+import math
+import json
+import argparse
+import time
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import modell
+import ergebnis_cache
+import layer_speicher
+import geometrie_pruefung
+from profil import Profil
+import shpVerknuepfung as kriterien_engine
+
+
+# Standard-Anzahl paralleler Prozesse (per Umgebungsvariable überschreibbar)
+MAX_WORKERS = int(os.environ.get("JURY_WORKERS", os.cpu_count() or 1))
+
+ERWARTETE_ATTRIBUTE = {
+    "Verkehrsflaechen": ["Nutzung"],
+    "Gebaeude": ["Geb_Hoehe"],
+    "oeffentliche_Gruenflaechen": ["Nutzung"],
+}
+
+
+# --- Layer- und Attribut-Checks (Hinweise für die Oberfläche)
+def pruefe_entwurf(layers):
+    """Prüft einen ``LayerCache`` auf fehlende Layer und Attribute.
+
+    Bereits geladene Layer werden wiederverwendet, sonst wird nur das Schema gelesen.
+    """
+    hinweise = []
+
+    missing_layers = [name + ".shp" for name in layers.fehlende()]
+    if missing_layers:
+        hinweise.append("Fehlende Layer: " + ", ".join(missing_layers))
+
+    for layer_name, pfade in layers.duplikate.items():
+        hinweise.append(f"`{layer_name}.shp` kommt {len(pfade)}-mal vor, verwendet wird `{pfade[0]}`.")
+
+    for layer_name, attrs in ERWARTETE_ATTRIBUTE.items():
+        if layers.pfade.get(layer_name) is None:
+            continue
+
+        spalten = layers.spalten(layer_name)
+        if spalten is None:
+            hinweise.append(f"`{layer_name}.shp` konnte nicht gelesen werden: {layers.fehler.get(layer_name)}")
+            continue
+
+        missing_attrs_in_layer = [a for a in attrs if a not in spalten]
+        if missing_attrs_in_layer:
+            hinweise.append(
+                f"In `{layer_name}.shp` fehlen folgende Attribute: {', '.join(missing_attrs_in_layer)}"
+            )
+    return hinweise
+
+
+# --- Einen Entwurf (ZIP-Bytes, ZIP-Datei oder Ordner) prüfen und bewerten
+def leeres_ergebnis(name, profil=None):
+    """Ergebnis-Dictionary eines Entwurfs mit allen Schlüsseln und Standardwerten."""
+    return {"name": name, "hinweise": [], "kriterien": None, "fehler": None, "log": [],
+            "sterne": None, "aus_cache": False, "schluessel": None,
+            "profil": profil if profil is not None else Profil(),
+            "rettungsweg_konflikte": [], "bewertung": None, "wiederverwendet": [], "geometrie": None,
+            "dauer": float("nan")}
+
+
+def geometrie_bericht(vorberechnung, cache=None):
+    """Geometrie-Prüfbericht der Flächenlayer.
+
+    Teile je Layer und Layerpaar kommen aus dem Cache, solange sich ihre Layer
+    nicht geändert haben; gelesen werden nur die Layer der übrigen Teile.
+    """
+    bekannt, schluessel = {}, {}
+    if cache is not None:
+        schluessel = kriterien_engine.pruef_schluessel(vorberechnung.layers.layer_hashes())
+        bekannt = cache.hole_berichte(schluessel)
+    teile = {teil: bekannt[teil] if teil in bekannt else geometrie_pruefung.pruefe_teil(vorberechnung, teil)
+             for teil in geometrie_pruefung.pruefteile()}
+    if cache is not None and len(bekannt) < len(teile):
+        cache.speichere_berichte(schluessel, {teil: teile[teil] for teil in teile if teil not in bekannt})
+    return geometrie_pruefung.bericht_aus_teilen(teile)
+
+
+def rettungsweg_bericht(vorberechnung, cache=None):
+    """Rettungsweg-Konflikte; aus dem Cache unter dem Schlüssel von K011, solange dessen Layer unverändert sind."""
+    schluessel = {}
+    if cache is not None:
+        schluessel = {"K011": kriterien_engine.kriterium_schluessel(vorberechnung.layers.layer_hashes())["K011"]}
+        bekannt = cache.hole_berichte(schluessel)
+        if "K011" in bekannt:
+            return bekannt["K011"]
+    ergebnis = kriterien_engine.rettungsweg_konflikte(vorberechnung)
+    if cache is not None:
+        cache.speichere_berichte(schluessel, {"K011": ergebnis})
+    return ergebnis
+
+
+def bewerte_entwurf(name, quelle, cache=None, speicher=False, fortschritt=None, layer_speicher=None,
+                    bereinigen=False):
+    """Bewertet einen Entwurf und liefert ein picklebares Ergebnis-Dictionary.
+
+    ``quelle`` sind die Bytes einer ZIP-Datei oder ein Pfad auf eine ZIP-Datei
+    bzw. einen Projektordner (siehe ``LayerCache``). ``cache`` ist ein
+    optionaler ``ErgebnisCache``, ``layer_speicher`` ein optionaler
+    ``LayerSpeicher``; ``fortschritt(stufe, art)`` wird zu Beginn jeder Stufe
+    aufgerufen, ``speicher=True`` misst die Speicherspitze je Stufe, und
+    ``bereinigen=True`` bereinigt die Flächenlayer vor der Berechnung.
+
+    Wichtige Schlüssel des Ergebnisses (siehe ``leeres_ergebnis``):
+    ``"kriterien"``, ``"sterne"`` (nur bei Cache-Treffern, sonst nach
+    ``sage_voraus``), ``"aus_cache"``, ``"schluessel"`` (zum Speichern nach
+    der Vorhersage), ``"wiederverwendet"`` (Kriterien aus dem Cache),
+    ``"rettungsweg_konflikte"`` (bei K011 = 0), ``"geometrie"`` (Bericht von
+    ``geometrie_pruefung.pruefe_geometrien``), ``"hinweise"`` und
+    ``"profil"``. Fehler werden nicht geworfen, sondern unter ``"fehler"``
+    zurückgegeben, damit ein defekter Entwurf den restlichen Batch nicht abbricht.
+    """
+    start = time.perf_counter()
+    profil = Profil(speicher=speicher, beobachter=fortschritt)
+    ergebnis = leeres_ergebnis(name, profil)
+    try:
+        with warnings.catch_warnings(record=True) as log:
+            warnings.simplefilter("always")
+
+            # ZIP-Inhalte werden ohne Entpacken gelesen; jeder Layer nur einmal,
+            # gemeinsam für Kriterien und Prüfung
+            with profil.messen("Entwurf öffnen"):
+                layers = kriterien_engine.LayerCache(quelle, speicher=layer_speicher, bereinigen=bereinigen)
+            with layers:
+                # reparierte Polygone, Raumindizes und Korridore teilen sich Kriterien, Prüfung und Konfliktsuche
+                vorberechnung = kriterien_engine.Vorberechnung(layers)
+                treffer = None
+                if cache is not None:
+                    with profil.messen("Cache-Abfrage"):
+                        ergebnis["schluessel"] = cache.schluessel(layers)
+                        treffer = cache.hole(ergebnis["schluessel"])
+
+                if treffer is not None:
+                    ergebnis.update(treffer, aus_cache=True)
+                else:
+                    # Kriterien, deren Eingabe-Layer unverändert sind, aus früheren Läufen übernehmen
+                    bekannt = {}
+                    if cache is not None:
+                        with profil.messen("Kriterien-Cache"):
+                            kriterium_schluessel = kriterien_engine.kriterium_schluessel(layers.layer_hashes())
+                            bekannt = cache.hole_kriterien(kriterium_schluessel)
+                    offen = [k for k in kriterien_engine.KRITERIEN if k not in bekannt]
+                    kriterien_engine.lade_alle(layers, profil, kriterien_engine.benoetigte_layer(offen))
+                    ergebnis["kriterien"] = kriterien_engine.compute_criteria(vorberechnung, profil, bekannt)
+                    ergebnis["wiederverwendet"] = sorted(bekannt)
+                    if cache is not None and offen:
+                        cache.speichere_kriterien({k: kriterium_schluessel[k] for k in offen},
+                                                  ergebnis["kriterien"])
+                # Überlappungen und ungültige Geometrien in allen Flächenlayern
+                with profil.messen("Geometrie-Prüfung"):
+                    try:
+                        ergebnis["geometrie"] = geometrie_bericht(vorberechnung, cache)
+                    except Exception as e:
+                        warnings.warn(f"Geometrie-Prüfung fehlgeschlagen: {e}")
+                # Lage aller Hindernisse nur bei nicht erfülltem Kriterium ermitteln
+                # (auch bei Cache-Treffern; aus dem Cache, sonst nur die Layer für K011 lesen)
+                if ergebnis["kriterien"].get("K011") == 0:
+                    with profil.messen("Rettungsweg-Konflikte"):
+                        ergebnis["rettungsweg_konflikte"] = rettungsweg_bericht(vorberechnung, cache)
+                with profil.messen("Attribut-Prüfung"):
+                    ergebnis["hinweise"] = pruefe_entwurf(layers)
+                if ergebnis["geometrie"] is not None:
+                    ergebnis["hinweise"] += geometrie_pruefung.hinweise(ergebnis["geometrie"])
+            ergebnis["log"] = [str(w.message) for w in log]
+    except Exception as e:
+        ergebnis["fehler"] = f"{type(e).__name__}: {e}"
+    ergebnis["dauer"] = time.perf_counter() - start
+    return ergebnis
+
+
+# --- Mehrere Entwürfe bewerten
+def bewerte_alle(entwuerfe, max_workers=MAX_WORKERS, cache=None, speicher=False, layer_speicher=None,
+                 bereinigen=False):
+    """Bewertet ``entwuerfe`` (Liste aus ``(name, quelle)``) parallel.
+
+    Liefert ``(index, ergebnis)`` in der Reihenfolge der Fertigstellung; über
+    den Index kann der Aufrufer die Ergebnisse stabil einsortieren. Bei nur
+    einem Entwurf oder ``max_workers <= 1`` wird seriell im eigenen Prozess
+    gerechnet.
+    """
+    entwuerfe = list(entwuerfe)
+    max_workers = max(1, min(int(max_workers), len(entwuerfe)))
+
+    if max_workers == 1:
+        for i, (name, quelle) in enumerate(entwuerfe):
+            yield i, bewerte_entwurf(name, quelle, cache, speicher, layer_speicher=layer_speicher,
+                                     bereinigen=bereinigen)
+        return
+
+    # "spawn" statt "fork": der Streamlit-Server läuft mit mehreren Threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+        futures = {
+            pool.submit(bewerte_entwurf, name, quelle, cache, speicher,
+                        layer_speicher=layer_speicher, bereinigen=bereinigen): i
+            for i, (name, quelle) in enumerate(entwuerfe)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                ergebnis = future.result()
+            except Exception as e:
+                # z. B. abgestürzter Worker-Prozess
+                ergebnis = fehler_ergebnis(entwuerfe[i][0], e)
+            yield i, ergebnis
+
+
+def fehler_ergebnis(name, fehler):
+    """Ergebnis-Dictionary für einen Entwurf, dessen Worker-Prozess keine Antwort geliefert hat."""
+    ergebnis = leeres_ergebnis(name)
+    ergebnis["fehler"] = f"{type(fehler).__name__}: {fehler}"
+    return ergebnis
+
+
+def laufzeit_bericht(ergebnisse, gesamtdauer, max_workers):
+    """Vergleicht die parallele Gesamtdauer mit der Summe der Einzeldauern (serieller Pfad)."""
+    seriell = sum(e["dauer"] for e in ergebnisse if not math.isnan(e["dauer"]))
+    return {
+        "entwuerfe": len(ergebnisse),
+        "prozesse": max_workers,
+        "gesamtdauer": gesamtdauer,
+        "seriell_geschaetzt": seriell,
+        "speedup": seriell / gesamtdauer if gesamtdauer > 0 else float("nan"),
+    }
+
+
+# --- Gemeinsame Vorhersage
+def sage_voraus(ergebnisse, rf_model, feature_order, cache=None, profil=None):
+    """Bewertet alle berechneten Entwürfe mit einem einzigen Modellaufruf.
+
+    Setzt je Ergebnis ``"bewertung"`` (Zeile aus ``modell.bewertung`` als
+    Dictionary) und, sofern nicht schon aus dem Cache bekannt, ``"sterne"``;
+    neue Sterne werden im ``cache`` abgelegt. Entwürfe ohne Kriterien bleiben
+    unverändert.
+    """
+    offen = [e for e in ergebnisse if e["kriterien"] is not None]
+    with (profil or Profil()).messen("Vorhersage") as eintrag:
+        X = modell.feature_matrix([e["kriterien"] for e in offen], feature_order)
+        eintrag["features"] = len(X)
+        tabelle = modell.bewertung(rf_model, X)
+    for e, zeile in zip(offen, tabelle.to_dict("records")):
+        e["bewertung"] = zeile
+        if e["sterne"] is None:
+            e["sterne"] = int(zeile["Sterne"])
+            if cache is not None and e["schluessel"] is not None:
+                try:
+                    cache.speichere(e["schluessel"], e["kriterien"], e["sterne"])
+                except Exception:
+                    pass  # Cache ist optional
+    return tabelle
+
+
+# --- Wettbewerbsordner einsammeln
+def finde_entwuerfe(wettbewerbspfad):
+    """Alle ZIP-Dateien und Unterordner eines Wettbewerbsordners, alphabetisch sortiert."""
+    entwuerfe = []
+    for eintrag in sorted(os.listdir(wettbewerbspfad)):
+        pfad = os.path.join(wettbewerbspfad, eintrag)
+        if os.path.isdir(pfad) or (os.path.isfile(pfad) and eintrag.lower().endswith(".zip")):
+            entwuerfe.append((eintrag, pfad))
+    return entwuerfe
+
+
+# --- Ergebnistabelle für einen ganzen Wettbewerb
+def bewerte_wettbewerb(entwuerfe, rf_model, feature_order, max_workers=MAX_WORKERS, fortschritt=None,
+                       cache=None, speicher=False, profile=None, layer_speicher=None, bereinigen=False):
+    """Bewertet alle Entwürfe und sagt die Sterne mit einem einzigen Modellaufruf voraus.
+
+    ``fortschritt(fertig, gesamt, ergebnis)`` wird nach jedem fertigen Entwurf
+    aufgerufen. Rückgabe ist eine Tabelle in der Reihenfolge von ``entwuerfe``.
+    Ist ``profile`` eine Liste, wird sie mit ``{"entwurf", "profil"}`` je
+    Entwurf gefüllt; die gemeinsame Vorhersage erscheint als eigener Eintrag.
+    """
+    ergebnisse = [None] * len(entwuerfe)
+    laeufe = bewerte_alle(entwuerfe, max_workers=max_workers, cache=cache, speicher=speicher,
+                          layer_speicher=layer_speicher, bereinigen=bereinigen)
+    for fertig, (i, ergebnis) in enumerate(laeufe, start=1):
+        ergebnisse[i] = ergebnis
+        if fortschritt is not None:
+            fortschritt(fertig, len(entwuerfe), ergebnis)
+
+    vorhersage_profil = Profil(speicher=speicher)
+    sage_voraus(ergebnisse, rf_model, feature_order, cache, vorhersage_profil)
+
+    zeilen = []
+    for e in ergebnisse:
+        zeile = {"Entwurf": e["name"]}
+        zeile.update({f: (e["kriterien"] or {}).get(f, np.nan) for f in feature_order})
+        zeile["Sterne"] = pd.NA if e["sterne"] is None else e["sterne"]
+        bewertung = e.get("bewertung") or {}
+        zeile["Konfidenz"] = round(bewertung["Konfidenz"], 3) if bewertung else np.nan
+        zeile["Alternative"] = bewertung.get("Alternative", pd.NA)
+        zeile["Knapp"] = bewertung.get("Knapp", pd.NA)
+        zeile["Ueberlappung_m2"] = round(geometrie_pruefung.ueberlappung_gesamt(e.get("geometrie")), 2)
+        zeile["Aus_Cache"] = e["aus_cache"]
+        zeile["Dauer_s"] = round(e["dauer"], 3)
+        zeile["Fehler"] = e["fehler"] or ""
+        zeilen.append(zeile)
+    tabelle = pd.DataFrame(zeilen)
+
+    if profile is not None:
+        profile.extend({"entwurf": e["name"], "profil": e["profil"].als_dict()} for e in ergebnisse)
+        profile.append({"entwurf": None, "profil": vorhersage_profil.als_dict()})
+    tabelle["Sterne"] = tabelle["Sterne"].astype("Int64")
+    tabelle["Alternative"] = tabelle["Alternative"].astype("Int64")
+    return tabelle
+
+
+def schreibe_tabelle(tabelle, pfad):
+    if pfad.lower().endswith(".xlsx"):
+        tabelle.to_excel(pfad, index=False)
+    else:
+        tabelle.to_csv(pfad, index=False)
+
+
+# --- Kommandozeile
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Bewertet alle Entwürfe (ZIP-Dateien oder Ordner) eines Wettbewerbsordners."
+    )
+    parser.add_argument("wettbewerb", help="Ordner mit einer ZIP-Datei bzw. einem Unterordner je Entwurf")
+    parser.add_argument("-o", "--ausgabe", default=None,
+                        help="Ergebnistabelle (.csv oder .xlsx), Standard: <wettbewerb>/Bewertungen.csv")
+    parser.add_argument("-j", "--workers", type=int, default=MAX_WORKERS,
+                        help=f"Anzahl paralleler Prozesse (Standard: {MAX_WORKERS})")
+    parser.add_argument("--modell", default=modell.MODEL_PATH, help="Pfad zum Bewertungsmodell")
+    parser.add_argument("--cache", default=ergebnis_cache.CACHE_PATH,
+                        help=f"SQLite-Ergebniscache (Standard: {ergebnis_cache.CACHE_PATH})")
+    parser.add_argument("--ohne-cache", action="store_true", help="alle Entwürfe neu berechnen")
+    parser.add_argument("--profil", metavar="JSON", help="Laufzeitprofil aller Entwürfe als JSON-Datei schreiben")
+    parser.add_argument("--speicher", action="store_true", help="Speicherspitze je Stufe messen (langsamer)")
+    parser.add_argument("--layer-speicher", nargs="?", const=layer_speicher.SPEICHER_PFAD, metavar="ORDNER",
+                        help="gelesene Layer als Feather ablegen und wiederverwenden "
+                             f"(Standard-Ordner: {layer_speicher.SPEICHER_PFAD})")
+    parser.add_argument("--bereinigen", action="store_true",
+                        help="ungültige Geometrien reparieren und überlappende Flächen je Layer vereinigen")
+    args = parser.parse_args(argv)
+
+    entwuerfe = finde_entwuerfe(args.wettbewerb)
+    if not entwuerfe:
+        parser.error(f"Keine Entwürfe in {args.wettbewerb} gefunden.")
+
+    rf_model, feature_order = modell.lade_modell(args.modell)
+    cache = None
+    if not args.ohne_cache:
+        cache = ergebnis_cache.ErgebnisCache(modell.modell_version(args.modell), pfad=args.cache)
+
+    def fortschritt(fertig, gesamt, ergebnis):
+        status = f"FEHLER: {ergebnis['fehler']}" if ergebnis["fehler"] else "ok"
+        if ergebnis["aus_cache"]:
+            status += " (Cache)"
+        print(f"[{fertig}/{gesamt}] {ergebnis['name']} ({ergebnis['dauer']:.1f} s) {status}",
+              file=sys.stderr, flush=True)
+
+    profile = []
+    start = time.perf_counter()
+    tabelle = bewerte_wettbewerb(entwuerfe, rf_model, feature_order,
+                                 max_workers=args.workers, fortschritt=fortschritt, cache=cache,
+                                 speicher=args.speicher, profile=profile,
+                                 layer_speicher=layer_speicher.LayerSpeicher(args.layer_speicher)
+                                 if args.layer_speicher else None,
+                                 bereinigen=args.bereinigen)
+    gesamtdauer = time.perf_counter() - start
+
+    if args.profil:
+        with open(args.profil, "w", encoding="utf-8") as f:
+            json.dump({"gesamtdauer_s": gesamtdauer, "prozesse": args.workers, "entwuerfe": profile}, f, indent=2)
+
+    ausgabe = args.ausgabe or os.path.join(args.wettbewerb, "Bewertungen.csv")
+    schreibe_tabelle(tabelle, ausgabe)
+
+    print(f"{len(tabelle)} Entwürfe in {gesamtdauer:.1f} s bewertet -> {ausgabe}", file=sys.stderr)
+    return 0 if (tabelle["Fehler"] == "").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+import io
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import subprocess
+import platform
+import tempfile
+import statistics
+import warnings
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box, Point, LineString
+
+import batch
+import modell
+from profil import Profil
+import shpVerknuepfung as kriterien_engine
+
+
+# Synthetisches Quartier: Blockraster mit Straßen, Lage in ETRS89/UTM 32N
+CRS = "EPSG:25832"
+URSPRUNG = (565000.0, 5930000.0)
+BLOCK = 60.0          # Kantenlänge Baublock [m]
+STRASSE = 14.0        # Straßenbreite [m]: 2 x 3 m Gehweg/Rad + 8 m Fahrbahn
+GEHWEG = 3.0
+
+STANDARD_GROESSEN = [4, 8, 16]
+STANDARD_WIEDERHOLUNGEN = 3
+REGRESSION_SCHWELLE = 0.2
+
+APP_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# Module, die die Startseite der App nicht importieren sollte
+SCHWERE_MODULE = ("pandas", "pyarrow", "altair", "geopandas", "shapely", "fiona", "pyproj", "sklearn", "joblib")
+
+
+# --- Synthetischer Entwurf
+def erzeuge_layer(groesse=8, seed=0):
+    """Erzeugt alle 14 Layer eines synthetischen Entwurfs mit ``groesse`` x ``groesse`` Baublöcken.
+
+    Die Geometrie folgt einem typischen Wettbewerbsentwurf: Blockrandbebauung
+    mit Höhenangaben, Innenhöfe als private Grünflächen, einzelne Blöcke als
+    öffentliche Grün- bzw. Platzflächen, Straßen aus Fahrbahn und Gehwegen mit
+    Nutzungskategorien samt Mittellinien, Bestands- und Entwurfsbäume, ein
+    Gewässer am Rand und Bestandsbebauung rund um das Gebiet. Liefert
+    ``{layer_name: GeoDataFrame}``.
+
+    Wie in der App gefordert überschneiden sich die Flächen nicht: Querstraßen
+    enden an den Kreuzungen, Gebäude eines Blocks halten Abstand zueinander.
+    Einzelne Pflanzinseln in der Fahrbahn liegen im Rettungsweg (K011 nicht
+    erfüllt), und mindestens eine Straße ist Begegnungszone mit Bebauung, damit
+    K005 ruhige und laute Lagen vergleichen kann.
+    """
+    rng = np.random.default_rng(seed)
+    x0, y0 = URSPRUNG
+    raster = BLOCK + STRASSE
+    kante = groesse * raster + STRASSE
+
+    def rechteck(x, y, breite, hoehe):
+        return box(x0 + x, y0 + y, x0 + x + breite, y0 + y + hoehe)
+
+    def gdf(geometrien, **spalten):
+        return gpd.GeoDataFrame(dict(spalten), geometry=list(geometrien), crs=CRS)
+
+    # Fahrbahnart je Straße: (senkrecht, Index) -> Kfz_Flaeche oder Begegnungszone
+    fahrbahnen = {(senkrecht, k): "Begegnungszone" if rng.random() < 0.25 else "Kfz_Flaeche"
+                  for senkrecht in (False, True) for k in range(groesse + 1)}
+    fahrbahnen[(False, groesse // 2)] = "Kfz_Flaeche"
+    fahrbahnen[(True, groesse // 2)] = "Begegnungszone"
+
+    gebaeude, hoehen, private_gruen, oeff_gruen, oeff_nutzung, plaetze = [], [], [], [], [], []
+    for i in range(groesse):
+        for j in range(groesse):
+            bx, by = STRASSE + i * raster, STRASSE + j * raster
+            art = rng.random()
+            if (i, j) == (groesse // 2, groesse // 2) or 0.1 <= art < 0.13:
+                plaetze.append(rechteck(bx, by, BLOCK, BLOCK))
+                continue
+            if art < 0.1:
+                oeff_gruen.append(rechteck(bx, by, BLOCK, BLOCK))
+                oeff_nutzung.append(rng.choice(["Park", "Spielplatz", "Sport", "Gemeinschaftsgarten"]))
+                continue
+
+            # Blockrand mit 2-4 Gebäuden, Innenhof als private Grünfläche;
+            # an Kfz-Straßen höher (Lärmschutz)
+            strassen = [(False, j), (False, j + 1), (True, i), (True, i + 1)]
+            tiefe = rng.uniform(10, 14)
+            abstand = 2.0
+            seiten = set(rng.choice(4, size=rng.integers(2, 5), replace=False))
+            # an Begegnungszonen immer bebaut (ruhige Lage für K005)
+            seiten |= {s for s in range(4) if fahrbahnen[strassen[s]] == "Begegnungszone"}
+            for seite in sorted(seiten):
+                laenge = rng.uniform(0.6, 1.0) * (BLOCK - 2 * abstand)
+                if seite == 0:
+                    g = rechteck(bx + abstand, by + abstand, laenge, tiefe)
+                elif seite == 1:
+                    g = rechteck(bx + abstand, by + BLOCK - abstand - tiefe, laenge, tiefe)
+                elif seite == 2:
+                    # seitliche Gebäude 1 m Abstand zu den Gebäuden oben und unten
+                    g = rechteck(bx + abstand, by + abstand + tiefe + 1, tiefe, laenge - 2 * tiefe - 2)
+                else:
+                    g = rechteck(bx + BLOCK - abstand - tiefe, by + abstand + tiefe + 1, tiefe, laenge - 2 * tiefe - 2)
+                if g.area > 0:
+                    an_kfz = fahrbahnen[strassen[seite]] == "Kfz_Flaeche"
+                    gebaeude.append(g)
+                    hoehen.append(int(rng.integers(4, 8) if an_kfz else rng.integers(2, 5)) * 3.2)
+            hof = BLOCK - 2 * (abstand + tiefe) - 2
+            if hof > 4:
+                private_gruen.append(rechteck(bx + abstand + tiefe + 1, by + abstand + tiefe + 1, hof, hof))
+
+    # Straßen: Fahrbahn (Kfz oder Begegnungszone), beidseitig Gehweg/Rad, Mittellinie.
+    # Waagerechte Straßen laufen durch, senkrechte bestehen aus Abschnitten zwischen den
+    # Kreuzungen; einzelne Abschnitte erhalten eine Pflanzinsel mitten in der Fahrbahn
+    verkehr, verkehr_nutzung, mittellinien, inseln = [], [], [], []
+    for k in range(groesse + 1):
+        lage = k * raster
+        for senkrecht in (False, True):
+            fahrbahn = fahrbahnen[(senkrecht, k)]
+            abschnitte = [(j * raster + STRASSE, BLOCK) for j in range(groesse)] if senkrecht else [(0, kante)]
+            for a, (von_l, laenge) in enumerate(abschnitte):
+                def streifen(von, breite):
+                    if senkrecht:
+                        return rechteck(lage + von, von_l, breite, laenge)
+                    return rechteck(von_l, lage + von, laenge, breite)
+                fahrbahn_flaeche = streifen(GEHWEG, STRASSE - 2 * GEHWEG)
+                if senkrecht and ((k, a) == (groesse // 2, 0) or rng.random() < 0.05):
+                    insel = rechteck(lage + STRASSE / 2 - 1, von_l + laenge / 2 - 4, 2, 8)
+                    inseln.append(insel)
+                    fahrbahn_flaeche = fahrbahn_flaeche.difference(insel)
+                verkehr += [streifen(0, GEHWEG), fahrbahn_flaeche, streifen(STRASSE - GEHWEG, GEHWEG)]
+                verkehr_nutzung += ["Fuss_Rad", fahrbahn, "Fuss_Rad"]
+            mitte = lage + STRASSE / 2
+            if senkrecht:
+                mittellinien.append(LineString([(x0 + mitte, y0), (x0 + mitte, y0 + kante)]))
+            else:
+                mittellinien.append(LineString([(x0, y0 + mitte), (x0 + kante, y0 + mitte)]))
+
+    # Bestandsbebauung ringsum sowie einzelne erhaltene Gebäude im Gebiet
+    umgebung = []
+    for i in range(-2, groesse + 2):
+        for j in range(-2, groesse + 2):
+            innen = 0 <= i < groesse and 0 <= j < groesse
+            if innen and rng.random() > 0.05:
+                continue
+            bx, by = STRASSE + i * raster, STRASSE + j * raster
+            for _ in range(rng.integers(1, 4)):
+                w, h = rng.uniform(8, 25, size=2)
+                umgebung.append(rechteck(bx + rng.uniform(0, BLOCK - w), by + rng.uniform(0, BLOCK - h), w, h))
+    umgebung += [g for g in gebaeude if rng.random() < 0.1]
+
+    # Bäume: Bestand verstreut, Entwurf erhält einen Teil und ergänzt Straßenbäume
+    anzahl_baeume = groesse * groesse * 6
+    bestand = [Point(x0 + x, y0 + y) for x, y in rng.uniform(0, kante, size=(anzahl_baeume, 2))]
+    entwurf = [Point(p.x + rng.normal(0, 0.3), p.y + rng.normal(0, 0.3)) for p in bestand if rng.random() < 0.6]
+    for linie in mittellinien[::2]:
+        for d in np.arange(5.0, linie.length, 12.0):
+            p = linie.interpolate(d)
+            entwurf.append(Point(p.x + STRASSE / 2 - GEHWEG / 2, p.y))
+
+    gruen_bestand = [rechteck(*rng.uniform(0, kante - 40, size=2), *rng.uniform(10, 40, size=2))
+                     for _ in range(max(1, groesse))]
+    wasser = [rechteck(-14, 0, 10, kante)]
+    oeff_gruen.append(rechteck(-4, 0, 2, kante))  # Uferpromenade am Gewässer
+    oeff_nutzung.append("Promenade")
+    oeff_gruen += inseln
+    oeff_nutzung += ["Strassengruen"] * len(inseln)
+
+    dach = [g.buffer(-1.0) for g in gebaeude[::3]]
+    pv = [g.buffer(-1.5) for g in gebaeude[1::3]]
+
+    return {
+        "Gebaeude": gdf(gebaeude, Geb_Hoehe=hoehen),
+        "Gebaeude_Umgebung": gdf(umgebung, id=range(len(umgebung))),
+        "Dachgruen": gdf(dach, id=range(len(dach))),
+        "PV_Anlage": gdf(pv, id=range(len(pv))),
+        "Verkehrsflaechen": gdf(verkehr, Nutzung=verkehr_nutzung),
+        "Verkehrsmittellinie": gdf(mittellinien, id=range(len(mittellinien))),
+        "oeffentliche_Gruenflaechen": gdf(oeff_gruen, Nutzung=oeff_nutzung),
+        "private_Gruenflaechen": gdf(private_gruen, id=range(len(private_gruen))),
+        "oeffentliche_Plaetze": gdf(plaetze, id=range(len(plaetze))),
+        "Wasser": gdf(wasser, id=range(len(wasser))),
+        "Bestandsbaeume": gdf(bestand, id=range(len(bestand))),
+        "Baeume_Entwurf": gdf(entwurf, id=range(len(entwurf))),
+        "Bestandsgruen": gdf(gruen_bestand, id=range(len(gruen_bestand))),
+        "Gebietsabgrenzung": gdf([rechteck(0, 0, kante, kante)], id=[1]),
+    }
+
+
+def erzeuge_entwurf(groesse=8, seed=0):
+    """Synthetischer Entwurf als ZIP-Bytes (wie ein Upload in der App)."""
+    layer = erzeuge_layer(groesse, seed)
+    assert set(layer) == set(kriterien_engine.layer_namen)
+    puffer = io.BytesIO()
+    with tempfile.TemporaryDirectory() as ordner, zipfile.ZipFile(puffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, gdf in layer.items():
+            gdf.to_file(os.path.join(ordner, name + ".shp"), encoding="utf-8")
+        for datei in sorted(os.listdir(ordner)):
+            zf.write(os.path.join(ordner, datei), datei)
+    return puffer.getvalue()
+
+
+# --- Messung
+def _zusammenfassen(dauern):
+    return {"median_s": statistics.median(dauern), "min_s": min(dauern), "laeufe": len(dauern)}
+
+
+def _stufen_dauern(profile, art):
+    dauern = {}
+    for p in profile:
+        for s in p.stufen:
+            if s["art"] == art:
+                dauern.setdefault(s["stufe"], []).append(s["dauer_s"])
+    return {stufe: _zusammenfassen(d) for stufe, d in dauern.items()}
+
+
+def miss_groesse(groesse, rf_model, feature_order, wiederholungen=STANDARD_WIEDERHOLUNGEN, seed=0):
+    """Misst Laden, jedes Kriterium, die Vorhersage und die komplette Pipeline für eine Entwurfsgröße."""
+    daten = erzeuge_entwurf(groesse, seed)
+    profile, vorhersage, pipeline, oeffnen = [], [], [], []
+    features = kriterien = None
+
+    for _ in range(wiederholungen):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+
+            # Einzelne Stufen der Engine
+            profil = Profil()
+            start = time.perf_counter()
+            with kriterien_engine.LayerCache(daten) as layers:
+                oeffnen.append(time.perf_counter() - start)
+                kriterien_engine.lade_alle(layers, profil)
+                kriterien = kriterien_engine.compute_criteria(layers, profil)
+                features = {s["stufe"]: s["features"] for s in profil.stufen if s["art"] == "layer"}
+            profile.append(profil)
+
+            X = modell.feature_matrix([kriterien], feature_order)
+            start = time.perf_counter()
+            modell.bewertung(rf_model, X)
+            vorhersage.append(time.perf_counter() - start)
+
+            # Kompletter Weg wie in der App: Upload-Bytes -> Ergebnis mit Sternen (ohne Cache)
+            start = time.perf_counter()
+            ergebnis = batch.bewerte_entwurf(f"synthetisch_{groesse}", daten)
+            batch.sage_voraus([ergebnis], rf_model, feature_order)
+            pipeline.append(time.perf_counter() - start)
+            if ergebnis["fehler"]:
+                raise RuntimeError(f"Pipeline fehlgeschlagen (Größe {groesse}): {ergebnis['fehler']}")
+
+    return {
+        "groesse": groesse,
+        "zip_bytes": len(daten),
+        "features": features,
+        "kriterien": {k: (None if pd.isna(v) else float(v)) for k, v in kriterien.items()},
+        "oeffnen": _zusammenfassen(oeffnen),
+        "layer": _stufen_dauern(profile, "layer"),
+        "kriterien_dauer": _stufen_dauern(profile, "kriterium"),
+        "vorhersage": _zusammenfassen(vorhersage),
+        "pipeline": _zusammenfassen(pipeline),
+    }
+
+
+def miss_modell(modellpfad=modell.MODEL_PATH, wiederholungen=STANDARD_WIEDERHOLUNGEN, zeilen=100):
+    """Ladezeit des Modells und gemeinsame Vorhersage für ``zeilen`` Entwürfe."""
+    laden, stapel = [], []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        rf_model, feature_order = modell.lade_modell(modellpfad)
+        laden.append(time.perf_counter() - start)
+    X = pd.DataFrame(np.random.default_rng(0).random((zeilen, len(feature_order))), columns=feature_order)
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        modell.bewertung(rf_model, X)
+        stapel.append(time.perf_counter() - start)
+    return {"laden": _zusammenfassen(laden), "stapel_zeilen": zeilen, "stapel_vorhersage": _zusammenfassen(stapel)}
+
+
+# Läuft in einem frischen Interpreter: erster Aufruf der Startseite ohne Upload
+_START_SKRIPT = """
+import sys, json, time
+from streamlit.testing.v1 import AppTest
+vorher = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+start = time.perf_counter()
+at.run()
+dauer = time.perf_counter() - start
+print(json.dumps({
+    "dauer": dauer,
+    "fehler": [str(e.value) for e in at.exception],
+    "module": [m for m in sys.argv[2:] if m in sys.modules and m not in vorher],
+}))
+"""
+
+
+def miss_start(wiederholungen=STANDARD_WIEDERHOLUNGEN, app=APP_PFAD):
+    """Kaltstart der App bis zur fertigen Startseite, je Lauf in einem neuen Prozess.
+
+    ``prozess`` umfasst Interpreterstart und Streamlit-Import, ``erste_seite``
+    nur den ersten Skriptlauf. Das Aufwärmen im Hintergrund ist abgeschaltet;
+    ``module`` listet die schweren Module, die schon die Startseite importiert.
+    """
+    prozess, seite, module = [], [], set()
+    umgebung = dict(os.environ, JURY_AUFWAERMEN="0")
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        lauf = subprocess.run(
+            [sys.executable, "-c", _START_SKRIPT, app, *SCHWERE_MODULE],
+            cwd=os.path.dirname(app), env=umgebung, capture_output=True, text=True, check=True,
+        )
+        prozess.append(time.perf_counter() - start)
+        messung = json.loads(lauf.stdout.strip().splitlines()[-1])
+        if messung["fehler"]:
+            raise RuntimeError(f"Startseite fehlgeschlagen: {messung['fehler'][0]}")
+        seite.append(messung["dauer"])
+        module.update(messung["module"])
+    return {"prozess": _zusammenfassen(prozess), "erste_seite": _zusammenfassen(seite), "module": sorted(module)}
+
+
+def benchmark(groessen=STANDARD_GROESSEN, wiederholungen=STANDARD_WIEDERHOLUNGEN, seed=0,
+              modellpfad=modell.MODEL_PATH, fortschritt=None):
+    """Führt alle Messungen aus und liefert den Bericht als Dictionary."""
+    import sklearn
+    import shapely
+
+    rf_model, feature_order = modell.lade_modell(modellpfad)
+    bericht = {
+        "umgebung": {
+            "zeitpunkt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plattform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "engine_version": kriterien_engine.ENGINE_VERSION,
+            "geopandas": gpd.__version__,
+            "shapely": shapely.__version__,
+            "scikit-learn": sklearn.__version__,
+        },
+        "parameter": {"groessen": list(groessen), "wiederholungen": wiederholungen, "seed": seed},
+        "modell": miss_modell(modellpfad, wiederholungen),
+        "start": miss_start(wiederholungen),
+        "entwuerfe": [],
+    }
+    for groesse in groessen:
+        if fortschritt is not None:
+            fortschritt(groesse)
+        bericht["entwuerfe"].append(miss_groesse(groesse, rf_model, feature_order, wiederholungen, seed))
+    return bericht
+
+
+# --- Vergleich zweier Berichte
+def _messwerte(bericht):
+    """Flache Sicht ``{name: median_s}`` auf alle Messungen eines Berichts."""
+    werte = {
+        "modell/laden": bericht["modell"]["laden"]["median_s"],
+        "modell/stapel_vorhersage": bericht["modell"]["stapel_vorhersage"]["median_s"],
+    }
+    if "start" in bericht:  # ältere Berichte ohne Startmessung
+        werte["start/prozess"] = bericht["start"]["prozess"]["median_s"]
+        werte["start/erste_seite"] = bericht["start"]["erste_seite"]["median_s"]
+    for e in bericht["entwuerfe"]:
+        praefix = f"groesse_{e['groesse']}"
+        for teil in ("oeffnen", "vorhersage", "pipeline"):
+            werte[f"{praefix}/{teil}"] = e[teil]["median_s"]
+        for gruppe in ("layer", "kriterien_dauer"):
+            for stufe, messung in e[gruppe].items():
+                werte[f"{praefix}/{stufe}"] = messung["median_s"]
+    return werte
+
+
+def vergleiche(alt, neu, schwelle=REGRESSION_SCHWELLE):
+    """Vergleicht zwei Berichte; liefert eine Tabelle mit Faktor und Regressionsmarkierung.
+
+    Als Regression gilt ein Median, der mehr als ``schwelle`` (relativ) über
+    dem alten Wert liegt. Messungen unter einer Millisekunde werden wegen
+    Messrauschen nicht markiert.
+    """
+    a, n = _messwerte(alt), _messwerte(neu)
+    zeilen = []
+    for name in sorted(set(a) & set(n)):
+        faktor = n[name] / a[name] if a[name] > 0 else np.nan
+        zeilen.append({
+            "messung": name, "alt_s": a[name], "neu_s": n[name], "faktor": faktor,
+            "regression": bool(faktor > 1 + schwelle and n[name] > 1e-3),
+        })
+    return pd.DataFrame(zeilen, columns=["messung", "alt_s", "neu_s", "faktor", "regression"])
+
+
+# --- Kommandozeile
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Misst die Laufzeit der Kriterienberechnung an synthetischen Entwürfen (ohne echte Wettbewerbsdaten)."
+    )
+    parser.add_argument("-g", "--groessen", type=int, nargs="+", default=STANDARD_GROESSEN,
+                        help=f"Baublöcke je Seite der synthetischen Entwürfe (Standard: {STANDARD_GROESSEN})")
+    parser.add_argument("-n", "--wiederholungen", type=int, default=STANDARD_WIEDERHOLUNGEN,
+                        help=f"Wiederholungen je Messung (Standard: {STANDARD_WIEDERHOLUNGEN})")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--modell", default=modell.MODEL_PATH, help="Pfad zum Bewertungsmodell")
+    parser.add_argument("-o", "--ausgabe", default="Benchmark.json", help="Bericht als JSON-Datei")
+    parser.add_argument("--vergleich", metavar="JSON", help="früherer Bericht; Regressionen führen zu Exit-Code 1")
+    parser.add_argument("--schwelle", type=float, default=REGRESSION_SCHWELLE,
+                        help=f"relative Verlangsamung, ab der eine Regression gemeldet wird (Standard: {REGRESSION_SCHWELLE})")
+    parser.add_argument("--erzeuge", metavar="ORDNER",
+                        help="nur die synthetischen Entwürfe als ZIP-Dateien in ORDNER schreiben (z. B. für batch.py)")
+    parser.add_argument("--start", action="store_true",
+                        help="nur den Kaltstart der App bis zur Startseite messen")
+    args = parser.parse_args(argv)
+
+    if args.start:
+        messung = miss_start(args.wiederholungen)
+        print(f"Kaltstart {messung['prozess']['median_s']:.2f} s, "
+              f"davon erste Seite {messung['erste_seite']['median_s']:.2f} s", file=sys.stderr)
+        print(f"schwere Module beim Start: {', '.join(messung['module']) or 'keine'}", file=sys.stderr)
+        return 0
+
+    if args.erzeuge:
+        os.makedirs(args.erzeuge, exist_ok=True)
+        for groesse in args.groessen:
+            pfad = os.path.join(args.erzeuge, f"synthetisch_{groesse}x{groesse}.zip")
+            with open(pfad, "wb") as f:
+                f.write(erzeuge_entwurf(groesse, args.seed))
+            print(pfad, file=sys.stderr)
+        return 0
+
+    def fortschritt(groesse):
+        print(f"Messe Entwurf mit {groesse} x {groesse} Blöcken ...", file=sys.stderr, flush=True)
+
+    bericht = benchmark(args.groessen, args.wiederholungen, args.seed, args.modell, fortschritt)
+    with open(args.ausgabe, "w", encoding="utf-8") as f:
+        json.dump(bericht, f, indent=2, default=float)
+
+    for e in bericht["entwuerfe"]:
+        print(f"{e['groesse']:>3} x {e['groesse']:<3} Blöcke: Pipeline {e['pipeline']['median_s']:.3f} s, "
+              f"Vorhersage {e['vorhersage']['median_s'] * 1000:.1f} ms", file=sys.stderr)
+    print(f"Bericht -> {args.ausgabe}", file=sys.stderr)
+
+    if args.vergleich:
+        with open(args.vergleich, encoding="utf-8") as f:
+            alt = json.load(f)
+        tabelle = vergleiche(alt, bericht, args.schwelle)
+        print(tabelle.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        if tabelle["regression"].any():
+            print(f"{int(tabelle['regression'].sum())} Regression(en) über {args.schwelle:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
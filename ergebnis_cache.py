@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import contextlib
+
+import shpVerknuepfung as kriterien_engine
+import geometrie_pruefung
+
+
+CACHE_PATH = os.environ.get(
+    "JURY_CACHE_DB", os.path.join(tempfile.gettempdir(), "digitale_jury_ergebnisse.sqlite")
+)
+MAX_EINTRAEGE = int(os.environ.get("JURY_CACHE_MAX", 5000))
+
+
+class ErgebnisCache:
+    """Begrenzter SQLite-Cache für Kriterienvektor und Sternebewertung je Entwurf.
+
+    Schlüssel ist der Inhalts-Hash der Layer-Dateien zusammen mit
+    ``ENGINE_VERSION`` und der Modellversion; ein neues Modell oder eine
+    geänderte Kriterienberechnung führt damit automatisch zu neuen Einträgen.
+    Über ``max_eintraege`` hinaus werden die am längsten nicht genutzten
+    Einträge verworfen (LRU).
+
+    Zusätzlich wird jeder Kriterienwert einzeln unter dem Hash seiner
+    Eingabe-Layer abgelegt (``kriterium_schluessel``). Ändert sich nur ein Teil
+    der Layer, müssen nur die davon abhängigen Kriterien neu berechnet werden.
+    Diese Einträge sind unabhängig vom Modell, ebenso die Prüfberichte: die
+    Teile der Geometrie-Prüfung je Layer bzw. Layerpaar (``pruef_schluessel``)
+    und die Rettungsweg-Konflikte unter dem Schlüssel von K011.
+
+    Jede Operation öffnet eine eigene Verbindung, damit das Objekt zwischen
+    Threads und Worker-Prozessen geteilt werden kann.
+    """
+
+    def __init__(self, modell_version, pfad=CACHE_PATH, max_eintraege=MAX_EINTRAEGE):
+        self.pfad = pfad
+        self.version = f"{kriterien_engine.ENGINE_VERSION}:{modell_version}"
+        self.max_eintraege = max_eintraege
+        with self._verbindung() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS ergebnisse ("
+                " schluessel TEXT PRIMARY KEY,"
+                " kriterien TEXT NOT NULL,"
+                " sterne INTEGER NOT NULL,"
+                " zugriff REAL NOT NULL)"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS ergebnisse_zugriff ON ergebnisse (zugriff)")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS kriterien ("
+                " schluessel TEXT PRIMARY KEY,"
+                " wert TEXT NOT NULL,"
+                " zugriff REAL NOT NULL)"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS kriterien_zugriff ON kriterien (zugriff)")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS berichte ("
+                " schluessel TEXT PRIMARY KEY,"
+                " bericht TEXT NOT NULL,"
+                " zugriff REAL NOT NULL)"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS berichte_zugriff ON berichte (zugriff)")
+
+    @contextlib.contextmanager
+    def _verbindung(self):
+        con = sqlite3.connect(self.pfad, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def schluessel(self, layers):
+        """Cache-Schlüssel für einen ``LayerCache`` (liest nur die Layer-Dateien, keine Geometrien)."""
+        return hashlib.sha256(f"{self.version}|{layers.inhalt_hash()}".encode()).hexdigest()
+
+    def hole(self, schluessel):
+        """``{"kriterien": dict, "sterne": int}`` oder ``None``."""
+        with self._verbindung() as con:
+            zeile = con.execute(
+                "SELECT kriterien, sterne FROM ergebnisse WHERE schluessel = ?", (schluessel,)
+            ).fetchone()
+            if zeile is None:
+                return None
+            con.execute("UPDATE ergebnisse SET zugriff = ? WHERE schluessel = ?", (time.time(), schluessel))
+        return {"kriterien": kriterien_engine.kriterien_aus_json(zeile[0]), "sterne": int(zeile[1])}
+
+    def speichere(self, schluessel, kriterien, sterne):
+        with self._verbindung() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO ergebnisse (schluessel, kriterien, sterne, zugriff) VALUES (?, ?, ?, ?)",
+                (schluessel, kriterien_engine.kriterien_als_json(kriterien), int(sterne), time.time()),
+            )
+            con.execute(
+                "DELETE FROM ergebnisse WHERE schluessel IN ("
+                " SELECT schluessel FROM ergebnisse ORDER BY zugriff DESC LIMIT -1 OFFSET ?)",
+                (self.max_eintraege,),
+            )
+
+    def hole_kriterien(self, schluessel):
+        """Bekannte Einzelwerte für ``{kriterium: kriterium_schluessel}`` als ``{kriterium: wert}``."""
+        if not schluessel:
+            return {}
+        platzhalter = ",".join("?" * len(schluessel))
+        with self._verbindung() as con:
+            zeilen = con.execute(
+                f"SELECT schluessel, wert FROM kriterien WHERE schluessel IN ({platzhalter})",
+                list(schluessel.values()),
+            ).fetchall()
+            con.executemany(
+                "UPDATE kriterien SET zugriff = ? WHERE schluessel = ?",
+                [(time.time(), s) for s, _ in zeilen],
+            )
+        werte = {}
+        for _, wert in zeilen:
+            werte.update(kriterien_engine.kriterien_aus_json(wert))
+        return werte
+
+    def speichere_kriterien(self, schluessel, kriterien):
+        """Legt jeden Wert aus ``kriterien`` unter seinem ``kriterium_schluessel`` ab."""
+        jetzt = time.time()
+        with self._verbindung() as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO kriterien (schluessel, wert, zugriff) VALUES (?, ?, ?)",
+                [(schluessel[k], kriterien_engine.kriterien_als_json({k: kriterien[k]}), jetzt)
+                 for k in schluessel if k in kriterien],
+            )
+            con.execute(
+                "DELETE FROM kriterien WHERE schluessel IN ("
+                " SELECT schluessel FROM kriterien ORDER BY zugriff DESC LIMIT -1 OFFSET ?)",
+                (self.max_eintraege * len(kriterien_engine.KRITERIEN),),
+            )
+
+    def hole_berichte(self, schluessel):
+        """Bekannte Prüfberichte für ``{teil: schluessel}`` als ``{teil: bericht}`` (auch ``None``-Berichte)."""
+        if not schluessel:
+            return {}
+        teil_je_schluessel = {s: teil for teil, s in schluessel.items()}
+        platzhalter = ",".join("?" * len(teil_je_schluessel))
+        with self._verbindung() as con:
+            zeilen = con.execute(
+                f"SELECT schluessel, bericht FROM berichte WHERE schluessel IN ({platzhalter})",
+                list(teil_je_schluessel),
+            ).fetchall()
+            con.executemany(
+                "UPDATE berichte SET zugriff = ? WHERE schluessel = ?",
+                [(time.time(), s) for s, _ in zeilen],
+            )
+        return {teil_je_schluessel[s]: json.loads(bericht) for s, bericht in zeilen}
+
+    def speichere_berichte(self, schluessel, berichte):
+        """Legt jeden Bericht aus ``berichte`` unter ``schluessel[teil]`` ab."""
+        jetzt = time.time()
+        with self._verbindung() as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO berichte (schluessel, bericht, zugriff) VALUES (?, ?, ?)",
+                [(schluessel[teil], json.dumps(bericht), jetzt) for teil, bericht in berichte.items()],
+            )
+            con.execute(
+                "DELETE FROM berichte WHERE schluessel IN ("
+                " SELECT schluessel FROM berichte ORDER BY zugriff DESC LIMIT -1 OFFSET ?)",
+                (self.max_eintraege * (len(geometrie_pruefung.pruefteile()) + 1),),
+            )
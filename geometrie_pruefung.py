@@ -0,0 +1,240 @@
+import itertools
+
+import numpy as np
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+# Flächenlayer, deren Flächen in Kriterien summiert werden (K002, K003, K007, K010, K012):
+# Überlappungen innerhalb eines Layers zählen dort doppelt
+FLAECHEN_LAYER = (
+    "Gebaeude",
+    "Dachgruen",
+    "PV_Anlage",
+    "Verkehrsflaechen",
+    "oeffentliche_Gruenflaechen",
+    "oeffentliche_Plaetze",
+    "private_Gruenflaechen",
+    "Wasser",
+)
+
+# Layer der Bodenebene schließen sich gegenseitig aus; Dachgrün und PV liegen dagegen auf Gebäuden
+BODEN_LAYER = (
+    "Gebaeude",
+    "Verkehrsflaechen",
+    "oeffentliche_Gruenflaechen",
+    "oeffentliche_Plaetze",
+    "private_Gruenflaechen",
+    "Wasser",
+)
+
+# Schnittflächen bis zu dieser Größe [m²] gelten als Digitalisierungsrauschen
+MIN_UEBERLAPPUNG_M2 = 0.01
+
+
+def flaechenanteil(geom):
+    """Nur die Polygone einer Geometrie (leeres Polygon, wenn keine vorhanden sind)."""
+    teile = shapely.get_parts(geom)
+    polygonal = [shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON]
+    teile = teile[np.isin(shapely.get_type_id(teile), polygonal)]
+    teile = shapely.get_parts(teile)
+    if len(teile) == 0:
+        return shapely.Polygon()
+    return teile[0] if len(teile) == 1 else shapely.MultiPolygon(list(teile))
+
+
+def geometrien(gdf):
+    """Geometrie-Array eines Layers; ungültige Geometrien über ``make_valid`` repariert.
+
+    Anders als ``buffer(0)`` behält ``make_valid`` alle Teile z. B. einer
+    Achterschleife; entstehende Linien und Punkte werden verworfen.
+    """
+    geoms = np.asarray(gdf.geometry.values)
+    ungueltig = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+    if ungueltig.any():
+        geoms = geoms.copy()
+        geoms[ungueltig] = [flaechenanteil(g) for g in shapely.make_valid(geoms[ungueltig])]
+    return geoms
+
+
+def ueberlappende_paare(a, b=None, min_flaeche=MIN_UEBERLAPPUNG_M2, baum=None):
+    """Paare sich flächig überlappender Geometrien als ``(i, j, flaeche)``.
+
+    Ohne ``b`` werden Überlappungen innerhalb von ``a`` gesucht (jedes Paar
+    einmal, ``i < j``), sonst zwischen ``a[i]`` und ``b[j]``. Kandidaten
+    liefert ein Raumindex über ``b`` (``baum``, sonst neu aufgebaut);
+    Schnittflächen werden nur für Kandidaten gebildet, die sich nicht bloß an
+    den Rändern berühren.
+    """
+    selbst = b is None
+    b = a if selbst else b
+    baum = shapely.STRtree(b) if baum is None else baum
+    i, j = baum.query(a, predicate="intersects")
+    if selbst:
+        behalten = i < j
+        i, j = i[behalten], j[behalten]
+    innen = ~shapely.touches(a[i], b[j])
+    i, j = i[innen], j[innen]
+    flaechen = shapely.area(shapely.intersection(a[i], b[j]))
+    treffer = flaechen > min_flaeche
+    return i[treffer], j[treffer], flaechen[treffer]
+
+
+def bereinige(gdf, spalten=()):
+    """Repariert ungültige Geometrien, entfernt leere und vereinigt überlappende Features.
+
+    Vereinigt werden zusammenhängende Gruppen sich überlappender Features mit
+    gleichen Werten in ``spalten`` (z. B. ``Nutzung``); die Attribute stammen
+    vom ersten Feature der Gruppe. Überlappungen zwischen Features mit
+    verschiedenen Werten bleiben bestehen; fehlende Spalten werden übergangen. Liefert ``(GeoDataFrame, statistik)``
+    mit der Anzahl reparierter, entfernter und vereinigter Features.
+    """
+    geoms = np.asarray(gdf.geometry.values)
+    reparieren = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+    geoms = geometrien(gdf)
+    behalten = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    statistik = {"repariert": int(reparieren.sum()), "entfernt": int((~behalten).sum()), "vereinigt": 0}
+
+    gdf, geoms = gdf[behalten], geoms[behalten]
+    i, j, _ = ueberlappende_paare(geoms)
+    spalten = [s for s in spalten if s in gdf.columns]
+    if spalten and len(i):
+        gruppe = gdf.groupby(spalten, dropna=False, sort=False).ngroup().to_numpy()
+        gleich = gruppe[i] == gruppe[j]
+        i, j = i[gleich], j[gleich]
+
+    if len(i):
+        n = len(geoms)
+        _, komponente = connected_components(csr_matrix((np.ones(len(i)), (i, j)), shape=(n, n)), directed=False)
+        _, erste, anzahl = np.unique(komponente, return_index=True, return_counts=True)
+        # Mitglieder je Komponente als zusammenhängende Abschnitte einer Sortierung
+        reihenfolge = np.argsort(komponente, kind="stable")
+        grenzen = np.concatenate([[0], np.cumsum(anzahl)])
+        geoms = geoms.copy()
+        for k in np.flatnonzero(anzahl > 1):
+            geoms[erste[k]] = shapely.union_all(geoms[reihenfolge[grenzen[k]:grenzen[k + 1]]])
+        erste = np.sort(erste)
+        gdf, geoms = gdf.iloc[erste], geoms[erste]
+        statistik["vereinigt"] = int(n - len(erste))
+
+    if statistik["repariert"] or statistik["vereinigt"]:
+        gdf = gdf.copy()
+        gdf[gdf.geometry.name] = geoms
+    return gdf, statistik
+
+
+def pruefteile(namen=FLAECHEN_LAYER):
+    """Teile der Prüfung: jeder Layer aus ``namen`` und jedes Paar aus ``BODEN_LAYER`` als Tupel.
+
+    Ein Teil hängt nur von seinen Layern ab und kann daher einzeln unter deren
+    Hashes zwischengespeichert werden.
+    """
+    boden = [name for name in BODEN_LAYER if name in namen]
+    return list(namen) + list(itertools.combinations(boden, 2))
+
+
+def pruefe_teil(layers, teil):
+    """Ergebnis eines Prüfteils (JSON-fähig; ``None``, wenn ein Layer fehlt oder leer ist).
+
+    Für einen Layer ``{"geometrien": ..., "ueberlappung": ..., "bereinigung": ...}``
+    mit der Zeile des Berichts, den Überlappungen innerhalb des Layers und der
+    Bereinigungsstatistik, für ein Layerpaar nur die Überlappungen dazwischen
+    (jeweils ``None`` ohne Überlappung bzw. Bereinigung).
+    """
+    namen = [teil] if isinstance(teil, str) else list(teil)
+    for name in namen:
+        gdf = layers.get(name)
+        if gdf is None or gdf.empty:
+            return None
+
+    a, b = namen[0], namen[-1]
+    i, _, flaechen = ueberlappende_paare(np.asarray(layers.gueltige_polygone(a).values),
+                                         None if a == b else np.asarray(layers.gueltige_polygone(b).values),
+                                         baum=layers.raumindex(b))
+    ueberlappung = None
+    if len(i):
+        ueberlappung = {"layer_a": a, "layer_b": b, "paare": int(len(i)), "flaeche_m2": float(flaechen.sum())}
+    if not isinstance(teil, str):
+        return ueberlappung
+
+    roh = np.asarray(layers.get(teil).geometry.values)
+    leer = shapely.is_missing(roh) | shapely.is_empty(roh)
+    ungueltig = ~shapely.is_valid(roh) & ~leer
+    zeile = {"layer": teil, "features": len(roh), "leer": int(leer.sum()),
+             "ungueltig": int(ungueltig.sum()), "grund": None}
+    if ungueltig.any():
+        zeile["grund"] = shapely.is_valid_reason(roh[np.argmax(ungueltig)])
+    return {"geometrien": zeile, "ueberlappung": ueberlappung, "bereinigung": layers.bereinigung.get(teil)}
+
+
+def bericht_aus_teilen(teile):
+    """Setzt den Bericht aus ``{teil: ergebnis}`` in der Reihenfolge der Teile zusammen."""
+    bericht = {"geometrien": [], "ueberlappungen": [], "bereinigung": {}}
+    paare = []
+    for teil, ergebnis in teile.items():
+        if ergebnis is None:
+            continue
+        if not isinstance(teil, str):
+            paare.append(ergebnis)
+            continue
+        bericht["geometrien"].append(ergebnis["geometrien"])
+        if ergebnis["ueberlappung"] is not None:
+            bericht["ueberlappungen"].append(ergebnis["ueberlappung"])
+        if ergebnis["bereinigung"] is not None:
+            bericht["bereinigung"][teil] = ergebnis["bereinigung"]
+    bericht["ueberlappungen"] += paare
+    return bericht
+
+
+def pruefe_geometrien(layers, namen=FLAECHEN_LAYER):
+    """Prüft Geometrien der Layer eines Entwurfs.
+
+    ``layers`` ist die ``Vorberechnung`` der Kriterien; geprüft werden alle
+    Layer aus ``namen`` (noch nicht gelesene werden dafür gelesen), damit der
+    Bericht nicht davon abhängt, welche Layer für die Kriterien gebraucht
+    wurden. Überlappungen werden auf den reparierten Polygonen
+    (``gueltige_polygone``) über deren Raumindizes gesucht, die auch die
+    Rettungsweg-Prüfung verwendet. Liefert ein Dictionary mit
+
+    - ``"geometrien"``: je Layer Anzahl Features, leere und ungültige Geometrien
+      (mit dem Grund der ersten ungültigen)
+    - ``"ueberlappungen"``: je betroffenem Layerpaar (gleicher Layer oder zwei
+      Layer aus ``BODEN_LAYER``) Anzahl überlappender Feature-Paare und
+      summierte Schnittfläche in m²
+    - ``"bereinigung"``: je bereinigtem Layer die Statistik aus ``bereinige``
+
+    Der Bericht setzt sich aus einzeln berechenbaren Teilen zusammen (siehe
+    ``pruefteile``, ``pruefe_teil`` und ``bericht_aus_teilen``).
+    """
+    return bericht_aus_teilen({teil: pruefe_teil(layers, teil) for teil in pruefteile(namen)})
+
+
+def hinweise(bericht):
+    """Texthinweise zu einem Prüfbericht (samt einer erfolgten Bereinigung) für die Oberfläche."""
+    texte = []
+    for zeile in bericht["geometrien"]:
+        if zeile["ungueltig"]:
+            texte.append(f"`{zeile['layer']}.shp` enthält {zeile['ungueltig']} ungültige Geometrie(n): {zeile['grund']}")
+        if zeile["leer"]:
+            texte.append(f"`{zeile['layer']}.shp` enthält {zeile['leer']} leere Geometrie(n).")
+    for zeile in bericht["ueberlappungen"]:
+        if zeile["layer_a"] == zeile["layer_b"]:
+            ort = f"innerhalb von `{zeile['layer_a']}.shp`"
+        else:
+            ort = f"zwischen `{zeile['layer_a']}.shp` und `{zeile['layer_b']}.shp`"
+        texte.append(f"Überlappungen {ort}: {zeile['paare']} Paar(e), {zeile['flaeche_m2']:.1f} m²")
+    for name, statistik in bericht.get("bereinigung", {}).items():
+        if any(statistik.values()):
+            texte.append(
+                f"`{name}.shp` bereinigt: {statistik['repariert']} repariert, {statistik['entfernt']} leer entfernt, "
+                f"{statistik['vereinigt']} mit überlappenden Features vereinigt."
+            )
+    return texte
+
+
+def ueberlappung_gesamt(bericht):
+    """Summe aller gemeldeten Schnittflächen in m² (``np.nan`` ohne Bericht)."""
+    if bericht is None:
+        return np.nan
+    return float(sum(z["flaeche_m2"] for z in bericht["ueberlappungen"]))
@@ -0,0 +1,78 @@
+import os
+import json
+import tempfile
+
+import geopandas as gpd
+from pyproj import CRS
+
+
+SPEICHER_PFAD = os.environ.get(
+    "JURY_LAYER_SPEICHER", os.path.join(tempfile.gettempdir(), "digitale_jury_layer")
+)
+
+
+class LayerSpeicher:
+    """Ablage bereits eingelesener Layer als unkomprimierte Feather-Dateien (Geometrie als WKB).
+
+    Schlüssel ist ein Inhalts-Hash je Layer (siehe ``LayerCache.speicher_schluessel``);
+    derselbe Layer aus verschiedenen Entwürfen oder Wettbewerben wird also nur
+    einmal abgelegt. Gelesen wird per Memory-Mapping, das erneute Parsen von
+    Shapefile und DBF über fiona entfällt. Koordinatensystem und zu einem
+    Layer gehörige Kennzahlen (``LayerCache.statistik``) liegen als JSON
+    daneben; das Koordinatensystem wird je Prozess nur einmal interpretiert.
+
+    Benötigt ``pyarrow``; ohne ist die Ablage wirkungslos. Das Verzeichnis kann
+    jederzeit gelöscht werden.
+    """
+
+    def __init__(self, pfad=SPEICHER_PFAD):
+        self.pfad = pfad
+        self._crs = {}
+        try:
+            import pyarrow  # noqa: F401
+            self.verfuegbar = True
+        except ImportError:
+            self.verfuegbar = False
+
+    def _datei(self, schluessel, endung):
+        return os.path.join(self.pfad, schluessel[:2], schluessel + endung)
+
+    def hole(self, schluessel):
+        """``(GeoDataFrame, statistik)`` oder ``None``."""
+        if not self.verfuegbar:
+            return None
+        datei = self._datei(schluessel, ".feather")
+        if not os.path.exists(datei):
+            return None
+        try:
+            with open(self._datei(schluessel, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            gdf = gpd.read_feather(datei, memory_map=True)
+            if meta["crs"] is not None:
+                if meta["crs"] not in self._crs:
+                    self._crs[meta["crs"]] = CRS.from_json(meta["crs"])
+                gdf = gdf.set_crs(self._crs[meta["crs"]])
+        except Exception:
+            return None  # fehlende oder beschädigte Datei: neu aus dem Shapefile lesen
+        return gdf, meta["statistik"]
+
+    def speichere(self, schluessel, gdf, statistik=None):
+        if not self.verfuegbar:
+            return
+        datei = self._datei(schluessel, ".feather")
+        os.makedirs(os.path.dirname(datei), exist_ok=True)
+        # Erst vollständig schreiben, dann umbenennen: parallele Worker sehen nie halbe Dateien
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(datei), suffix=".tmp")
+        os.close(fd)
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"crs": gdf.crs.to_json() if gdf.crs is not None else None, "statistik": statistik}, f)
+            os.replace(tmp, self._datei(schluessel, ".json"))
+            # ohne Koordinatensystem schreiben; dessen Interpretation ist beim Lesen der teuerste Teil
+            ohne_crs = gdf.copy()
+            ohne_crs.crs = None
+            ohne_crs.to_feather(tmp, compression="uncompressed")
+            os.replace(tmp, datei)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "final_RF_model.pkl")
+
+# Kompakter Export des Waldes (NumPy-Arrays, per Memory-Mapping lesbar) neben der Modelldatei
+BAUM_PFAD = os.path.splitext(MODEL_PATH)[0] + ".baeume"
+BAUM_ARRAYS = ("merkmal", "schwelle", "links", "rechts", "fehlend_links", "wert", "wurzeln")
+
+# Fallback: exakt die Reihenfolge, mit der trainiert wurde
+FEATURE_ORDER = ["K002","K003","K004","K005","K006","K007","K008","K009","K010","K011","K012","K013","K015"]
+
+# Threads für die Vorhersage (leer = Einstellung des Modells, -1 = alle Kerne)
+MODELL_JOBS = int(os.environ["JURY_MODELL_JOBS"]) if os.environ.get("JURY_MODELL_JOBS") else None
+
+# Wahrscheinlichkeitsabstand, unter dem eine Bewertung als knapp gilt
+KNAPP_ABSTAND = 0.2
+
+
+# --- Bewertungsmodell laden
+def lade_modell(pfad=MODEL_PATH, kompakt=True):
+    """Lädt das Random-Forest-Modell und liefert ``(rf_model, feature_order)``.
+
+    Mit ``kompakt=True`` wird ein passender Export (``exportiere_baeume``)
+    neben der Modelldatei bevorzugt: ein ``ArrayWald`` statt des vollständigen
+    scikit-learn-Objekts, ohne Entpickeln und ohne scikit-learn zu importieren.
+    """
+    if kompakt:
+        export = os.path.splitext(pfad)[0] + ".baeume"
+        wald = ArrayWald.lade(export, modell_version(pfad)) if os.path.isdir(export) else None
+        if wald is not None:
+            return wald, list(wald.feature_names_in_)
+
+    import joblib
+    bundle = joblib.load(pfad)
+    if isinstance(bundle, dict) and "model" in bundle and "features" in bundle:
+        rf_model = bundle["model"]
+        feature_order = list(bundle["features"])
+    else:
+        rf_model = bundle
+        feature_order = list(FEATURE_ORDER)
+
+    feature_order = list(getattr(rf_model, "feature_names_in_", feature_order))
+    return rf_model, feature_order
+
+
+def modell_version(pfad=MODEL_PATH):
+    """Kurzer Inhalts-Hash der Modelldatei (für Ergebnis-Caches)."""
+    h = hashlib.sha256()
+    with open(pfad, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+# --- Feature-Matrix aus Kriterien-Dictionaries
+def feature_matrix(kriterien_liste, feature_order):
+    """Stapelt Kriterien-Dictionaries zu einer Feature-Matrix (fehlende Werte -> 0)."""
+    X = pd.DataFrame(
+        [{f: pd.to_numeric(k.get(f), errors="coerce") for f in feature_order} for k in kriterien_liste],
+        columns=feature_order,
+    )
+    return X.fillna(0.0).astype(float)
+
+
+# --- Vorhersage
+def baum_stimmen(rf_model, X):
+    """Anzahl der Entscheidungsbäume je Zeile und Klasse (Spalten wie ``rf_model.classes_``)."""
+    if isinstance(rf_model, ArrayWald):
+        return rf_model.stimmen(X)
+    # Einzelbäume kennen die Spaltennamen nicht und erwarten float32
+    X_arr = np.asarray(X, dtype=np.float32)
+    stimmen = np.zeros((len(X_arr), len(rf_model.classes_)), dtype=int)
+    for baum in getattr(rf_model, "estimators_", []):
+        np.add.at(stimmen, (np.arange(len(X_arr)), baum.predict_proba(X_arr).argmax(axis=1)), 1)
+    return stimmen
+
+
+@contextlib.contextmanager
+def _threads(rf_model, n_jobs):
+    """Setzt ``n_jobs`` des Waldes für die Dauer eines Aufrufs."""
+    if n_jobs is None or not hasattr(rf_model, "n_jobs"):
+        yield
+        return
+    vorher = rf_model.n_jobs
+    rf_model.n_jobs = n_jobs
+    try:
+        yield
+    finally:
+        rf_model.n_jobs = vorher
+
+
+def bewertung(rf_model, X, n_jobs=MODELL_JOBS):
+    """Sterne, Konfidenz und Stimmverteilung für alle Zeilen von ``X`` in einem Aufruf.
+
+    Spalten der Rückgabe (Index wie ``X``):
+
+    - ``Sterne``: Klasse mit der höchsten mittleren Wahrscheinlichkeit (wie ``predict``)
+    - ``Konfidenz``: deren Wahrscheinlichkeit aus ``predict_proba``
+    - ``Alternative`` / ``Abstand``: zweitwahrscheinlichste Klasse und Abstand zur ersten
+    - ``Knapp``: ``Abstand < KNAPP_ABSTAND``
+    - ``P_<k>``: Wahrscheinlichkeit je Sterneklasse
+    - ``Stimmen_<k>``: Anzahl der Entscheidungsbäume, die für ``k`` Sterne stimmen
+    """
+    klassen = np.asarray(rf_model.classes_).astype(int)
+    spalten = (["Sterne", "Konfidenz", "Alternative", "Abstand", "Knapp"]
+               + [f"P_{k}" for k in klassen] + [f"Stimmen_{k}" for k in klassen])
+    if len(X) == 0:
+        return pd.DataFrame(columns=spalten)
+
+    with _threads(rf_model, n_jobs):
+        proba = np.asarray(rf_model.predict_proba(X))
+
+    stimmen = baum_stimmen(rf_model, X)
+
+    # Stabile Sortierung: bei Gleichstand gewinnt wie bei ``predict`` die kleinere Klasse
+    rang = np.argsort(-proba, axis=1, kind="stable")
+    if proba.shape[1] == 1:
+        rang = np.hstack([rang, rang])
+    zeilen = np.arange(len(proba))
+    erste = proba[zeilen, rang[:, 0]]
+    abstand = erste - proba[zeilen, rang[:, 1]] if proba.shape[1] > 1 else np.ones(len(proba))
+
+    ergebnis = pd.DataFrame({
+        "Sterne": klassen[rang[:, 0]],
+        "Konfidenz": erste,
+        "Alternative": klassen[rang[:, 1]],
+        "Abstand": abstand,
+        "Knapp": abstand < KNAPP_ABSTAND,
+    }, index=X.index)
+    for j, k in enumerate(klassen):
+        ergebnis[f"P_{k}"] = proba[:, j]
+    for j, k in enumerate(klassen):
+        ergebnis[f"Stimmen_{k}"] = stimmen[:, j]
+    return ergebnis
+
+
+# --- Kompakter Wald aus NumPy-Arrays
+class ArrayWald:
+    """Random Forest als zusammenhängende Knoten-Arrays aller Bäume.
+
+    Je Knoten: ``merkmal`` (Spaltenindex, Blätter -1), ``schwelle``,
+    ``links``/``rechts`` (globale Knotenindizes, Blätter -1),
+    ``fehlend_links`` (Richtung bei fehlenden Werten) und ``wert``
+    (normierte Klassenanteile); ``wurzeln`` enthält den Wurzelknoten jedes
+    Baums. Die Vorhersage durchläuft alle Bäume für alle Zeilen gleichzeitig
+    und rechnet wie scikit-learn (Eingaben als float32, Mittel der
+    Blattanteile in Baumreihenfolge), liefert also dieselben Ergebnisse wie
+    ``rf_model.predict``/``predict_proba``.
+
+    Mit ``mmap_mode="r"`` geladen teilen sich alle Prozesse eines Servers
+    dieselben Seiten im Arbeitsspeicher.
+    """
+
+    def __init__(self, arrays, classes, feature_names):
+        for name in BAUM_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_estimators = len(self.wurzeln)
+
+    @classmethod
+    def aus_sklearn(cls, rf_model, feature_order):
+        teile = {name: [] for name in BAUM_ARRAYS}
+        versatz = 0
+        for baum in rf_model.estimators_:
+            t = baum.tree_
+            blatt = t.children_left == -1
+            teile["merkmal"].append(np.where(blatt, -1, t.feature).astype(np.int32))
+            teile["schwelle"].append(t.threshold.astype(np.float64))
+            teile["links"].append(np.where(blatt, -1, t.children_left + versatz).astype(np.int32))
+            teile["rechts"].append(np.where(blatt, -1, t.children_right + versatz).astype(np.int32))
+            teile["fehlend_links"].append(np.asarray(getattr(t, "missing_go_to_left", np.zeros(t.node_count)), dtype=bool))
+            wert = t.value[:, 0, :].astype(np.float64)
+            teile["wert"].append(wert / wert.sum(axis=1, keepdims=True))
+            teile["wurzeln"].append(np.array([versatz], dtype=np.int32))
+            versatz += t.node_count
+        arrays = {name: np.concatenate(teil) for name, teil in teile.items()}
+        return cls(arrays, rf_model.classes_, feature_order)
+
+    def speichere(self, ziel, quelle_version=None):
+        os.makedirs(ziel, exist_ok=True)
+        for name in BAUM_ARRAYS:
+            np.save(os.path.join(ziel, name + ".npy"), np.ascontiguousarray(getattr(self, name)))
+        meta = {"classes": self.classes_.tolist(), "features": list(self.feature_names_in_),
+                "modell_version": quelle_version}
+        with open(os.path.join(ziel, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def lade(cls, ziel, quelle_version=None):
+        """Lädt einen Export per Memory-Mapping; ``None``, wenn er fehlt oder zu einem anderen Modell gehört."""
+        try:
+            with open(os.path.join(ziel, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if quelle_version is not None and meta.get("modell_version") != quelle_version:
+                return None
+            arrays = {name: np.load(os.path.join(ziel, name + ".npy"), mmap_mode="r") for name in BAUM_ARRAYS}
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(arrays, meta["classes"], meta["features"])
+
+    def _matrix(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[list(self.feature_names_in_)]
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def blaetter(self, X):
+        """Blattknoten je Zeile und Baum, Form ``(zeilen, baeume)``."""
+        X = self._matrix(X)
+        merkmal, schwelle = np.asarray(self.merkmal), np.asarray(self.schwelle)
+        links, rechts, fehlend_links = np.asarray(self.links), np.asarray(self.rechts), np.asarray(self.fehlend_links)
+
+        # Flach: Eintrag z * baeume + b ist der aktuelle Knoten von Zeile z in Baum b
+        knoten = np.tile(np.asarray(self.wurzeln), len(X))
+        zeilenstart = np.repeat(np.arange(len(X)) * X.shape[1], self.n_estimators)
+        werte = X.ravel()
+        mit_nan = bool(np.isnan(werte).any())
+        offen = np.flatnonzero(merkmal[knoten] >= 0)
+        while len(offen):
+            k = knoten[offen]
+            x = werte[zeilenstart[offen] + merkmal[k]]
+            nach_links = x <= schwelle[k]
+            if mit_nan:
+                nach_links = np.where(np.isnan(x), fehlend_links[k], nach_links)
+            knoten[offen] = np.where(nach_links, links[k], rechts[k])
+            offen = offen[merkmal[knoten[offen]] >= 0]
+        return knoten.reshape(len(X), self.n_estimators)
+
+    def predict_proba(self, X):
+        werte = np.asarray(self.wert)[self.blaetter(X)]   # (zeilen, baeume, klassen)
+        proba = np.zeros((werte.shape[0], werte.shape[2]))
+        for b in range(self.n_estimators):
+            proba += werte[:, b, :]
+        return proba / self.n_estimators
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def stimmen(self, X):
+        wahl = np.asarray(self.wert)[self.blaetter(X)].argmax(axis=2)
+        stimmen = np.zeros((len(wahl), len(self.classes_)), dtype=int)
+        for b in range(self.n_estimators):
+            np.add.at(stimmen, (np.arange(len(wahl)), wahl[:, b]), 1)
+        return stimmen
+
+
+def exportiere_baeume(pfad=MODEL_PATH, ziel=None):
+    """Schreibt den Wald aus ``pfad`` als ``ArrayWald`` nach ``ziel`` (Standard: ``<modell>.baeume``)."""
+    ziel = ziel or os.path.splitext(pfad)[0] + ".baeume"
+    rf_model, feature_order = lade_modell(pfad, kompakt=False)
+    wald = ArrayWald.aus_sklearn(rf_model, feature_order)
+    wald.speichere(ziel, modell_version(pfad))
+    return ziel
+
+
+# --- Kommandozeile
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Exportiert das Bewertungsmodell als kompakte NumPy-Arrays für schnelles Laden."
+    )
+    parser.add_argument("--modell", default=MODEL_PATH, help="Pfad zum Bewertungsmodell")
+    parser.add_argument("-o", "--ziel", default=None, help="Zielordner (Standard: <modell>.baeume)")
+    args = parser.parse_args(argv)
+    ziel = exportiere_baeume(args.modell, args.ziel)
+    print(f"Export -> {ziel}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
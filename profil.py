@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import tracemalloc
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Speicherspitzen standardmäßig messen? (per Umgebungsvariable, kostet Laufzeit)
+SPEICHER_STANDARD = os.environ.get("JURY_PROFIL_SPEICHER", "") == "1"
+
+
+def _rss_max_mb():
+    if resource is None:
+        return None
+    # ru_maxrss ist unter Linux in KiB angegeben
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Profil:
+    """Sammelt Laufzeit, Speicherspitze, Feature-Anzahl und Fehlergrund je Stufe.
+
+    Stufen sind z. B. das Öffnen des Entwurfs, das Lesen jedes Layers, jedes
+    Kriterium und die Vorhersage. Mit ``speicher=True`` wird die
+    Python-Speicherspitze je Stufe über ``tracemalloc`` gemessen (deutlich
+    langsamer); der maximale Arbeitsspeicher des Prozesses (``rss_max_mb``)
+    wird immer erfasst. Ein ``beobachter(stufe, art)`` wird zu Beginn jeder
+    Stufe aufgerufen (Fortschrittsanzeige). Das Objekt ist picklebar und kann
+    aus Worker-Prozessen zurückgegeben werden; der Beobachter wird dabei nicht
+    mitgenommen.
+    """
+
+    def __init__(self, speicher=False, beobachter=None):
+        self.speicher = speicher
+        self.beobachter = beobachter
+        self.stufen = []
+
+    def __getstate__(self):
+        zustand = self.__dict__.copy()
+        zustand["beobachter"] = None
+        return zustand
+
+    @contextlib.contextmanager
+    def messen(self, stufe, art="stufe"):
+        eintrag = {"stufe": stufe, "art": art, "dauer_s": None, "peak_mb": None,
+                   "rss_max_mb": None, "features": None, "fehler": None}
+        self.stufen.append(eintrag)
+        if self.beobachter is not None:
+            self.beobachter(stufe, art)
+
+        tracemalloc_gestartet = False
+        if self.speicher:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                tracemalloc_gestartet = True
+            tracemalloc.reset_peak()
+            basis = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield eintrag
+        except Exception as e:
+            eintrag["fehler"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            eintrag["dauer_s"] = time.perf_counter() - start
+            if self.speicher:
+                eintrag["peak_mb"] = max(0, tracemalloc.get_traced_memory()[1] - basis) / 2**20
+                if tracemalloc_gestartet:
+                    tracemalloc.stop()
+            eintrag["rss_max_mb"] = _rss_max_mb()
+
+    def gesamtdauer(self):
+        return sum(s["dauer_s"] or 0.0 for s in self.stufen)
+
+    def als_dict(self):
+        return {"gesamtdauer_s": self.gesamtdauer(), "stufen": list(self.stufen)}
+
+    def als_json(self, **kwargs):
+        return json.dumps(self.als_dict(), **kwargs)
@@ -0,0 +1,121 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import modell
+
+
+# Mögliche Werte je Kriterium: diskrete Stufen oder ein stetiger Bereich
+WERTEBEREICHE = {
+    "K002": {"werte": [1, 2, 3, 4, 5]},
+    "K003": {"von": 0.0, "bis": 1.0},
+    "K004": {"werte": [1, 1.5, 2]},
+    "K005": {"werte": [0, 1, 2]},
+    "K006": {"von": 0.0, "bis": 1.0},
+    "K007": {"von": 0.0, "bis": 1.0},
+    "K008": {"werte": [1, 2, 3, 4, 5, 6, 7, 8]},
+    "K009": {"werte": [0, 1, 2]},
+    "K010": {"von": -1.0, "bis": 1.0},
+    "K011": {"werte": [0, 1]},
+    "K012": {"von": 0.0, "bis": 1.0},
+    "K013": {"von": 0.0, "bis": 1.0},
+    "K015": {"werte": [0, 1]},
+}
+STANDARD_SCHRITTE = 21
+
+
+def achse(kriterium, schritte=STANDARD_SCHRITTE):
+    """Rasterwerte eines Kriteriums (stetige Bereiche in ``schritte`` gleichen Abständen)."""
+    bereich = WERTEBEREICHE[kriterium]
+    if "werte" in bereich:
+        return np.asarray(bereich["werte"], dtype=float)
+    return np.round(np.linspace(bereich["von"], bereich["bis"], schritte), 4)
+
+
+def spanne(kriterium):
+    bereich = WERTEBEREICHE[kriterium]
+    if "werte" in bereich:
+        return float(max(bereich["werte"]) - min(bereich["werte"]))
+    return float(bereich["bis"] - bereich["von"])
+
+
+def _basis(kriterien, feature_order):
+    return modell.feature_matrix([kriterien], feature_order).iloc[0]
+
+
+def raster(kriterien, feature_order, achsen):
+    """Alle Kombinationen der ``achsen`` (``{kriterium: werte}``), übrige Kriterien wie im Entwurf.
+
+    Zusätzlich zur Feature-Matrix steht in ``"Aenderung"`` der Abstand zum
+    Entwurf: Summe der Beträge der Änderungen, je Kriterium auf dessen
+    Wertebereich normiert.
+    """
+    basis = _basis(kriterien, feature_order)
+    namen = list(achsen)
+    kombinationen = np.array(list(itertools.product(*(achsen[n] for n in namen))), dtype=float)
+    X = pd.DataFrame(np.tile(basis.to_numpy(dtype=float), (len(kombinationen), 1)), columns=feature_order)
+    aenderung = np.zeros(len(kombinationen))
+    for j, name in enumerate(namen):
+        X[name] = kombinationen[:, j]
+        aenderung += np.abs(kombinationen[:, j] - basis[name]) / (spanne(name) or 1.0)
+    return X, aenderung
+
+
+def was_waere_wenn(rf_model, feature_order, kriterien, auswahl, schritte=STANDARD_SCHRITTE):
+    """Bewertet das Raster über die Kriterien in ``auswahl`` mit einem einzigen Modellaufruf.
+
+    Liefert eine Tabelle mit den Rasterwerten der gewählten Kriterien,
+    ``"Aenderung"`` und den Spalten aus ``modell.bewertung``.
+    """
+    X, aenderung = raster(kriterien, feature_order, {k: achse(k, schritte) for k in auswahl})
+    bewertung = modell.bewertung(rf_model, X)
+    tabelle = X[list(auswahl)].copy()
+    tabelle["Aenderung"] = aenderung
+    return pd.concat([tabelle, bewertung], axis=1)
+
+
+def kleinste_aenderung(tabelle, ziel_sterne):
+    """Zeile des Rasters mit mindestens ``ziel_sterne`` und der kleinsten Änderung (``None``, wenn keine)."""
+    treffer = tabelle[tabelle["Sterne"] >= ziel_sterne]
+    if treffer.empty:
+        return None
+    # Bei gleicher Änderung die sicherere Bewertung bevorzugen
+    return treffer.sort_values(["Aenderung", "Konfidenz"], ascending=[True, False], kind="stable").iloc[0]
+
+
+def naechster_stern(rf_model, feature_order, kriterien, schritte=STANDARD_SCHRITTE, ziel_sterne=None):
+    """Kleinste Änderung je einzelnem Kriterium, mit der ``ziel_sterne`` erreicht werden.
+
+    Alle Einzelvariationen aller Kriterien werden gemeinsam in einem
+    Modellaufruf bewertet. Ohne ``ziel_sterne`` gilt die aktuelle Bewertung + 1.
+    Kriterien, die allein nicht ausreichen, fehlen in der Ergebnistabelle.
+    """
+    basis = _basis(kriterien, feature_order)
+    if ziel_sterne is None:
+        aktuell = int(modell.bewertung(rf_model, basis.to_frame().T)["Sterne"].iloc[0])
+        ziel_sterne = aktuell + 1
+
+    teile, aenderungen, namen = [], [], []
+    for kriterium in feature_order:
+        if kriterium not in WERTEBEREICHE:
+            continue
+        X, aenderung = raster(kriterien, feature_order, {kriterium: achse(kriterium, schritte)})
+        teile.append(X)
+        aenderungen.append(aenderung)
+        namen += [kriterium] * len(X)
+    X = pd.concat(teile, ignore_index=True)
+    tabelle = modell.bewertung(rf_model, X)
+    tabelle["Kriterium"] = namen
+    tabelle["Wert"] = [X.at[i, k] for i, k in enumerate(namen)]
+    tabelle["Aenderung"] = np.concatenate(aenderungen)
+
+    zeilen = []
+    for kriterium, gruppe in tabelle.groupby("Kriterium", sort=False):
+        beste = kleinste_aenderung(gruppe, ziel_sterne)
+        if beste is not None:
+            zeilen.append({"Kriterium": kriterium, "Aktuell": basis[kriterium], "Nötig": beste["Wert"],
+                           "Sterne": int(beste["Sterne"]), "Konfidenz": beste["Konfidenz"],
+                           "Aenderung": beste["Aenderung"]})
+    spalten = ["Kriterium", "Aktuell", "Nötig", "Sterne", "Konfidenz", "Aenderung"]
+    return pd.DataFrame(zeilen, columns=spalten).sort_values("Aenderung", kind="stable").reset_index(drop=True)
@@ -1,11 +1,26 @@
+import io
+import fiona
 import geopandas as gpd
+import shapely
 import pandas as pd
 import os
+import zipfile
 import numpy as np
-import sys
-import glob
-
-projektpfad = sys.argv[1] if len(sys.argv) > 1 else "."
+import warnings
+import json
+import hashlib
+import argparse
+from fiona.io import ZipMemoryFile
+from pyproj import Transformer
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_bipartite_matching
+
+from profil import Profil
+import layer_speicher
+import geometrie_pruefung
+
+# Bei jeder Änderung an der Berechnung eines Kriteriums erhöhen (macht gecachte Ergebnisse ungültig)
+ENGINE_VERSION = "2"
 
 layer_namen = [
     "Gebaeude",
@@ -24,39 +39,453 @@ layer_namen = [
     "Gebietsabgrenzung"
 ]
 
-layers = {}
-
-for name in layer_namen:
-    # Durchsuche rekursiv ALLE Unterordner
-    matches = glob.glob(os.path.join(projektpfad, "**", name + ".shp"), recursive=True)
-    if matches:
-        path = matches[0]
-        layers[name] = gpd.read_file(path)
-    else:
-        layers[name] = None
-
-# --- Kriterien berechnen
-k = {}   # Dictionary für alle K-Werte
+# Dateien, aus denen ein Layer gelesen wird
+LAYER_DATEIENDUNGEN = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+# Attributspalten, die von den Kriterien gelesen werden; alle übrigen Layer nur mit Geometrie
+SPALTEN = {
+    "Gebaeude": ["Geb_Hoehe"],
+    "Verkehrsflaechen": ["Nutzung"],
+    "oeffentliche_Gruenflaechen": ["Nutzung"],
+}
+
+# Kontext-Layer reichen oft weit über das Gebiet hinaus: Geometrien werden nur
+# innerhalb der Gebietsabgrenzung plus KONTEXT_PUFFER behalten, Anzahl und
+# Gesamtfläche (K004, K010) aber über den ganzen Layer blockweise erfasst
+KONTEXT_LAYER = ("Gebaeude_Umgebung", "Bestandsgruen")
+KONTEXT_PUFFER = 10.0   # größter Puffer eines Kriteriums (K005: 10 m um Kfz-Flächen)
+LESEBLOCK = 20000       # Features je Leseblock für Kontext-Layer
+
+
+# --- Layer einlesen
+def finde_layer_dateien(dateien):
+    """Ordnet den bekannten Layern ihre ``.shp``-Dateien zu.
+
+    ``dateien`` sind relative Pfade mit ``/`` als Trenner (Ordnerinhalt oder
+    Einträge einer ZIP-Datei). Liefert ``{layername: [pfad, ...]}``. Kommt ein
+    Layer mehrfach vor, steht der am höchsten liegende (bei gleicher Tiefe der
+    alphabetisch erste) Pfad vorne.
+    """
+    gesucht = set(layer_namen)
+    funde = {}
+    for datei in dateien:
+        teile = datei.split("/")
+        # versteckte Ordner (z. B. .git) überspringen, wie zuvor bei glob
+        if any(teil.startswith(".") for teil in teile[:-1]):
+            continue
+        name, endung = os.path.splitext(teile[-1])
+        if endung == ".shp" and name in gesucht:
+            funde.setdefault(name, []).append(datei)
+
+    for pfade in funde.values():
+        pfade.sort(key=lambda p: (p.count("/"), p))
+    return funde
+
+
+def ordner_dateien(projektpfad):
+    """Alle Dateien unterhalb von ``projektpfad`` in einem einzigen Durchlauf (relativ, ``/``-getrennt)."""
+    dateien = []
+    for wurzel, ordner, namen in os.walk(projektpfad):
+        ordner[:] = [o for o in ordner if not o.startswith(".")]
+        rel = os.path.relpath(wurzel, projektpfad)
+        for datei in namen:
+            dateien.append(datei if rel == "." else "/".join(rel.split(os.sep) + [datei]))
+    return dateien
+
+
+class LayerCache:
+    """Liest jeden Layer eines Entwurfs höchstens einmal ein.
+
+    ``quelle`` ist ein Projektordner, der Pfad einer ZIP-Datei oder der Inhalt
+    einer ZIP-Datei als ``bytes``. ZIP-Dateien werden nicht entpackt, sondern
+    über GDALs ``/vsizip/`` gelesen; dabei werden nur die bekannten Layer samt
+    Begleitdateien (``.shx``, ``.dbf``, ``.prj``) angefasst.
+
+    Verhält sich beim Zugriff wie das bisherige Layer-Dictionary
+    (``layers.get(name)`` -> GeoDataFrame oder ``None``) und kann daher direkt
+    an ``compute_criteria`` sowie an die Attribut-Prüfung übergeben werden.
+    Layer werden erst beim ersten Zugriff gelesen; Lesefehler landen in
+    ``fehler`` und der Layer gilt als fehlend. Gelesen werden nur die Spalten
+    aus ``SPALTEN``; Kontext-Layer (``KONTEXT_LAYER``) werden blockweise gelesen
+    und auf die Umgebung der Gebietsabgrenzung beschränkt, ihre Anzahl und
+    Gesamtfläche über den ganzen Layer stehen in ``statistik``.
+
+    Mit einem ``LayerSpeicher`` (``speicher``) werden gelesene Layer unter
+    ihrem Inhalts-Hash abgelegt und bei späteren Läufen von dort statt aus dem
+    Shapefile geladen.
+
+    Mit ``bereinigen=True`` werden Flächenlayer nach dem Einlesen bereinigt
+    (``geometrie_pruefung.bereinige``: ungültige Geometrien repariert, leere
+    entfernt, überlappende Features gleicher Nutzung vereinigt); was dabei
+    geändert wurde, steht in ``bereinigung``.
+    """
+
+    def __init__(self, quelle, speicher=None, bereinigen=False):
+        self.quelle = quelle
+        self.speicher = speicher
+        self.bereinigen = bereinigen
+        self.bereinigung = {}
+        self._hashes = None
+        self._zip = None
+        self._zf = None
+        if isinstance(quelle, bytes):
+            self._zf = zipfile.ZipFile(io.BytesIO(quelle))
+            dateien = self._zf.namelist()
+            self._zip = ZipMemoryFile(quelle)
+            self._basis = self._zip.name
+        elif os.path.isdir(quelle):
+            dateien = ordner_dateien(quelle)
+            self._basis = None
+        else:
+            self._zf = zipfile.ZipFile(quelle)
+            dateien = self._zf.namelist()
+            self._basis = "/vsizip/" + os.path.abspath(quelle)
+
+        self._dateien = set(dateien)
+        funde = finde_layer_dateien(dateien)
+        self.pfade = {name: funde[name][0] if name in funde else None for name in layer_namen}
+        self.duplikate = {name: pfade for name, pfade in funde.items() if len(pfade) > 1}
+        self.fehler = {}
+        self.statistik = {}
+        self._layers = {}
+        self._schemata = {}
+
+        for name, pfade in self.duplikate.items():
+            warnings.warn(f"Layer {name} wurde {len(pfade)}-mal gefunden, verwendet wird {pfade[0]}.")
+
+    def _lesepfad(self, name):
+        datei = self.pfade.get(name)
+        if datei is None:
+            return None
+        if self._basis is None:
+            return os.path.join(self.quelle, *datei.split("/"))
+        return self._basis + "/" + datei
+
+    def _lies_datei(self, datei):
+        if self._zf is not None:
+            return self._zf.read(datei)
+        with open(os.path.join(self.quelle, *datei.split("/")), "rb") as f:
+            return f.read()
+
+    def layer_hashes(self):
+        """SHA-256 je Layer über die Inhalte von ``.shp`` und Begleitdateien (fehlende Layer -> None).
+
+        Bereinigte Flächenlayer liefern andere Kriterienwerte und erhalten
+        daher einen eigenen Hash.
+        """
+        hashes = dict(self._roh_hashes())
+        if self.bereinigen:
+            for name in geometrie_pruefung.FLAECHEN_LAYER:
+                if hashes[name] is not None:
+                    hashes[name] = hashlib.sha256(f"{hashes[name]}|bereinigt".encode()).hexdigest()
+        return hashes
+
+    def _roh_hashes(self):
+        if self._hashes is not None:
+            return self._hashes
+        hashes = {}
+        for name in layer_namen:
+            datei = self.pfade[name]
+            if datei is None:
+                hashes[name] = None
+                continue
+            h = hashlib.sha256()
+            stamm = datei[:-len(".shp")]
+            for endung in LAYER_DATEIENDUNGEN:
+                if stamm + endung in self._dateien:
+                    h.update(endung.encode())
+                    h.update(self._lies_datei(stamm + endung))
+            hashes[name] = h.hexdigest()
+        self._hashes = hashes
+        return hashes
+
+    def speicher_schluessel(self, name):
+        """Schlüssel für den ``LayerSpeicher``: Layer-Inhalt samt allem, was das Einlesen beeinflusst."""
+        # abgelegt wird immer der unbereinigte Layer
+        hashes = self._roh_hashes()
+        teile = [ENGINE_VERSION, name, hashes[name], ",".join(SPALTEN.get(name, []))]
+        if name in KONTEXT_LAYER:
+            teile += [hashes["Gebietsabgrenzung"] or "", repr(KONTEXT_PUFFER)]
+        return hashlib.sha256("|".join(map(str, teile)).encode()).hexdigest()
+
+    def inhalt_hash(self):
+        """Ein Hash über alle Layer; unabhängig von Dateinamen, Ordnerstruktur und übrigen Dateien."""
+        h = hashlib.sha256()
+        for name, layer_hash in self.layer_hashes().items():
+            h.update(f"{name}={layer_hash};".encode())
+        return h.hexdigest()
+
+    def close(self):
+        if self._zf is not None:
+            self._zf.close()
+            self._zf = None
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fehlende(self):
+        return [name for name in layer_namen if self.pfade[name] is None]
+
+    def get(self, name, default=None):
+        if name not in self._layers:
+            pfad = self._lesepfad(name)
+            layer = None
+            if pfad is not None:
+                try:
+                    layer = self._lies(name, pfad)
+                except Exception as e:
+                    self.fehler[name] = str(e)
+            self._layers[name] = layer
+        layer = self._layers[name]
+        return default if layer is None else layer
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def _lies(self, name, pfad):
+        layer = self._lies_roh(name, pfad)
+        if self.bereinigen and name in geometrie_pruefung.FLAECHEN_LAYER:
+            # eine fehlgeschlagene Bereinigung darf den Layer nicht verwerfen
+            try:
+                layer, self.bereinigung[name] = geometrie_pruefung.bereinige(layer, SPALTEN.get(name, []))
+            except Exception as e:
+                warnings.warn(f"Layer {name} konnte nicht bereinigt werden: {e}")
+        return layer
+
+    def _lies_roh(self, name, pfad):
+        schluessel = None
+        if self.speicher is not None:
+            schluessel = self.speicher_schluessel(name)
+            treffer = self.speicher.hole(schluessel)
+            if treffer is not None:
+                layer, statistik = treffer
+                if statistik is not None:
+                    self.statistik[name] = statistik
+                return layer
+
+        if name in KONTEXT_LAYER:
+            layer = self._lies_kontext(name, pfad)
+        else:
+            layer = gpd.read_file(pfad, include_fields=SPALTEN.get(name, []))
 
-get = lambda name: layers.get(name, None)
+        if schluessel is not None:
+            try:
+                self.speicher.speichere(schluessel, layer, self.statistik.get(name))
+            except Exception as e:
+                warnings.warn(f"Layer {name} konnte nicht abgelegt werden: {e}")
+        return layer
+
+    def _kontext_maske(self):
+        gebiet = self.get("Gebietsabgrenzung")
+        if gebiet is None or gebiet.empty:
+            return None
+        geoms = gebiet.geometry
+        maske = (geoms.union_all() if hasattr(geoms, "union_all") else geoms.unary_union).buffer(KONTEXT_PUFFER)
+        shapely.prepare(maske)
+        return maske
+
+    def _lies_kontext(self, name, pfad):
+        """Liest einen Kontext-Layer blockweise; behält nur Features nahe der Gebietsabgrenzung."""
+        maske = self._kontext_maske()
+        with fiona.open(pfad) as src:
+            anzahl = len(src)
+        teile, flaeche, gemessen = [], 0.0, 0
+        for start in range(0, max(anzahl, 1), LESEBLOCK):
+            block = gpd.read_file(pfad, rows=slice(start, start + LESEBLOCK), include_fields=SPALTEN.get(name, []))
+            flaechen = block.geometry.area
+            flaeche += flaechen.sum()
+            gemessen += flaechen.count()
+            if maske is not None:
+                block = block[shapely.intersects(maske, block.geometry.values)]
+            teile.append(block)
+        self.statistik[name] = {"anzahl": anzahl, "flaeche": float(flaeche), "gemessen": int(gemessen)}
+        if len(teile) == 1:
+            return teile[0]
+        return gpd.GeoDataFrame(pd.concat(teile, ignore_index=True), crs=teile[0].crs)
+
+    def spalten(self, name):
+        """Attributspalten eines Layers laut Schema (unabhängig von den tatsächlich gelesenen Spalten)."""
+        if name in self._schemata:
+            return self._schemata[name]
+        pfad = self._lesepfad(name)
+        if pfad is None or name in self.fehler:
+            return None
+        try:
+            with fiona.open(pfad) as src:
+                self._schemata[name] = list(src.schema["properties"]) + ["geometry"]
+        except Exception as e:
+            self.fehler[name] = str(e)
+            return None
+        return self._schemata[name]
+
+    def alle(self):
+        return {name: self.get(name) for name in layer_namen}
+
+
+def lade_layer(projektpfad):
+    """Liest alle bekannten Layer eines Entwurfs ein (fehlende Layer -> None)."""
+    with LayerCache(projektpfad) as cache:
+        return cache.alle()
+
+
+# --- Gemeinsame Vorberechnung je Entwurf
+POLYGON_TYPEN = ["Polygon", "MultiPolygon"]
+
+
+class Vorberechnung:
+    """Einmal je Entwurf abgeleitete Geometriegrößen, von allen Kriterien gemeinsam genutzt.
+
+    Flächen je Feature, Flächensummen und -mittel, Polygon-Teilmengen (auch
+    reparierte, ``gueltige_polygone``), Raumindizes, Rettungsweg-Korridore und
+    Nutzungsmasken werden beim ersten Zugriff berechnet und danach
+    wiederverwendet. Die Layer selbst sind wie beim Layer-Dictionary über
+    ``get`` erreichbar; Kriterien, Geometrie-Prüfung und Konfliktsuche
+    erhalten dasselbe Objekt.
+    """
+
+    def __init__(self, layers):
+        self.layers = layers
+        self._werte = {}
+
+    @classmethod
+    def von(cls, layers):
+        return layers if isinstance(layers, cls) else cls(layers)
+
+    def get(self, name, default=None):
+        layer = self.layers.get(name)
+        return default if layer is None else layer
+
+    def _merke(self, schluessel, berechnung):
+        if schluessel not in self._werte:
+            self._werte[schluessel] = berechnung()
+        return self._werte[schluessel]
+
+    def flaechen(self, name):
+        """Fläche je Feature (``None``, wenn der Layer fehlt)."""
+        def berechnung():
+            gdf = self.get(name)
+            return None if gdf is None else gdf.geometry.area
+        return self._merke(("flaechen", name), berechnung)
+
+    def _statistik(self, name):
+        """Anzahl und Gesamtfläche über den ganzen Layer, falls nur ein Ausschnitt geladen ist."""
+        return getattr(self.layers, "statistik", {}).get(name)
+
+    def anzahl(self, name):
+        """Anzahl der Features im ganzen Layer (``None``, wenn der Layer fehlt)."""
+        gdf = self.get(name)
+        if gdf is None:
+            return None
+        statistik = self._statistik(name)
+        return statistik["anzahl"] if statistik else len(gdf)
+
+    def flaeche_summe(self, name, maske=None):
+        flaechen = self.flaechen(name)
+        if flaechen is None:
+            return None
+        if maske is None:
+            statistik = self._statistik(name)
+            if statistik:
+                return statistik["flaeche"]
+            return self._merke(("summe", name), flaechen.sum)
+        return flaechen[maske].sum()
+
+    def flaeche_mittel(self, name):
+        flaechen = self.flaechen(name)
+        if flaechen is None:
+            return None
+        statistik = self._statistik(name)
+        if statistik:
+            return statistik["flaeche"] / statistik["gemessen"] if statistik["gemessen"] else np.nan
+        return self._merke(("mittel", name), flaechen.mean)
+
+    def gebietsflaeche(self):
+        flaeche = self.flaeche_summe("Gebietsabgrenzung")
+        return np.nan if flaeche is None else flaeche
+
+    @property
+    def bereinigung(self):
+        """Statistik der automatischen Bereinigung je Layer (siehe ``LayerCache``)."""
+        return getattr(self.layers, "bereinigung", {})
+
+    def polygone(self, name):
+        """Nur Features mit (Multi-)Polygon-Geometrie (``None``, wenn der Layer fehlt)."""
+        def berechnung():
+            gdf = self.get(name)
+            return None if gdf is None else gdf[gdf.geometry.type.isin(POLYGON_TYPEN)]
+        return self._merke(("polygone", name), berechnung)
+
+    def gueltige_polygone(self, name):
+        """Geometrien aus ``polygone`` als GeoSeries, ungültige über ``make_valid`` repariert.
+
+        Dieselbe Reparatur wie in der Geometrie-Prüfung und der Bereinigung
+        (``geometrie_pruefung.geometrien``); ``None``, wenn der Layer fehlt.
+        """
+        def berechnung():
+            gdf = self.polygone(name)
+            if gdf is None:
+                return None
+            return gpd.GeoSeries(geometrie_pruefung.geometrien(gdf), index=gdf.index, crs=gdf.crs)
+        return self._merke(("gueltig", name), berechnung)
+
+    def raumindex(self, name):
+        """``STRtree`` über ``gueltige_polygone(name)`` (``None``, wenn der Layer fehlt)."""
+        def berechnung():
+            geoms = self.gueltige_polygone(name)
+            return None if geoms is None else shapely.STRtree(np.asarray(geoms.values))
+        return self._merke(("raumindex", name), berechnung)
+
+    def korridore(self):
+        """Rettungsweg-Korridore je Mittellinien-Segment als ``(segment_ids, korridore, raumindex)``.
+
+        ``None`` ohne Mittellinien. ``quad_segs=16`` wie ``GeoSeries.buffer``:
+        gröbere Kreisbögen verkleinern Schnittflächen an Korridorenden.
+        """
+        def berechnung():
+            ml = self.get("Verkehrsmittellinie")
+            if ml is None or ml.empty:
+                return None
+            korridore = shapely.buffer(np.asarray(ml.geometry.values), KORRIDOR_HALBBREITE, quad_segs=16)
+            return list(ml.index), korridore, shapely.STRtree(korridore)
+        return self._merke(("korridore",), berechnung)
+
+    def nutzung(self, name, normalisiert=False):
+        """Spalte ``Nutzung``; normalisiert klein geschrieben und ohne ``_`` (``None`` ohne Spalte)."""
+        def berechnung():
+            gdf = self.get(name)
+            if gdf is None or "Nutzung" not in gdf.columns:
+                return None
+            if normalisiert:
+                return gdf["Nutzung"].astype(str).str.lower().str.replace("_", "", regex=False)
+            return gdf["Nutzung"]
+        return self._merke(("nutzung", name, normalisiert), berechnung)
 
-# --- Gebietsflaeche berechnen (wenn Layer vorhanden)
-if get("Gebietsabgrenzung") is not None:
-    gebietsflaeche = get("Gebietsabgrenzung").geometry.area.sum()
-else:
-    gebietsflaeche = np.nan
+    def nutzung_maske(self, name, wert, normalisiert=False):
+        def berechnung():
+            nutzung = self.nutzung(name, normalisiert)
+            return None if nutzung is None else (nutzung == wert)
+        return self._merke(("maske", name, wert, normalisiert), berechnung)
 
 
-# K002 - Zukunftsfaehige Mobilitaet 
-try:
-    verkehr = get("Verkehrsflaechen")
+# K002 - Zukunftsfaehige Mobilitaet
+def k002_mobilitaet(layers):
+    verkehr = layers.get("Verkehrsflaechen")
     if verkehr is None or verkehr.empty or "Nutzung" not in verkehr.columns:
         raise ValueError("Verkehrsflaechen fehlt oder hat kein Feld 'Nutzung'.")
 
     # Flächen nach Kategorien
-    fuss_rad   = verkehr[verkehr["Nutzung"] == "Fuss_Rad"].geometry.area.sum()
-    kfz        = verkehr[verkehr["Nutzung"] == "Kfz_Flaeche"].geometry.area.sum()
-    begegnung  = verkehr[verkehr["Nutzung"] == "Begegnungszone"].geometry.area.sum()
+    def flaeche(kategorie):
+        return layers.flaeche_summe("Verkehrsflaechen", layers.nutzung_maske("Verkehrsflaechen", kategorie))
+
+    fuss_rad   = flaeche("Fuss_Rad")
+    kfz        = flaeche("Kfz_Flaeche")
+    begegnung  = flaeche("Begegnungszone")
 
     # Auto-lastige Fläche = Auto + 0.5 * Begegnungszone
     auto_flaeche = kfz + 0.5 * begegnung
@@ -64,137 +493,125 @@ try:
     # Verhältnis berechnen
     if auto_flaeche == 0 and fuss_rad > 0:
         # Komplett autofrei → Bestnote
-        k["K002"] = 5
-    else:
-        ratio = fuss_rad / auto_flaeche if auto_flaeche > 0 else 0
-
-        if ratio > 2:
-            k["K002"] = 4
-        elif ratio > 1:
-            k["K002"] = 3
-        elif ratio > 0.5:
-            k["K002"] = 2
-        else:
-            k["K002"] = 1
+        return 5
 
-except Exception as e:
-    k["K002"] = np.nan
-    
+    ratio = fuss_rad / auto_flaeche if auto_flaeche > 0 else 0
+    if ratio > 2:
+        return 4
+    elif ratio > 1:
+        return 3
+    elif ratio > 0.5:
+        return 2
+    return 1
 
-# K003 - Anteil der Gruenflaechen
-try:
-    oeff = get("oeffentliche_Gruenflaechen")
-    priv = get("private_Gruenflaechen")
 
-    fl_oeff = oeff.geometry.area.sum() if oeff is not None else 0.0
-    fl_priv = priv.geometry.area.sum() if priv is not None else 0.0
+# K003 - Anteil der Gruenflaechen
+def k003_gruenflaechenanteil(layers):
+    fl_oeff = layers.flaeche_summe("oeffentliche_Gruenflaechen") or 0.0
+    fl_priv = layers.flaeche_summe("private_Gruenflaechen") or 0.0
 
     gruenflaeche = fl_oeff + fl_priv
-    k["K003"] = round(gruenflaeche / gebietsflaeche, 2) if (gebietsflaeche and gebietsflaeche > 0) else np.nan
-except Exception:
-    k["K003"] = np.nan
+    gebiet = layers.gebietsflaeche()
+    return round(gruenflaeche / gebiet, 2) if (gebiet and gebiet > 0) else np.nan
 
 
 # K004 - Einbettung in die Umgebung
-try:
-    g = get("Gebaeude")
-    b = get("Gebaeude_Umgebung")
-    if g is not None and b is not None:
-        koernigkeit = g.geometry.area.mean() / b.geometry.area.mean()
-        if 0.75 <= koernigkeit <= 1.25:
-            k["K004"] = 2
-        elif 0.5 <= koernigkeit < 0.75 or 1.25 < koernigkeit <= 1.5:
-            k["K004"] = 1.5
-        else:
-            k["K004"] = 1
-    else:
-        raise ValueError
-except:
-    k["K004"] = np.nan
-
-
-# K005 - Lärmschutz 
-try:
-    g = get("Gebaeude")
-    v = get("Verkehrsflaechen")
-
-    if g is not None and v is not None and "Geb_Hoehe" in g.columns and "Nutzung" in v.columns:
-        # Kopien & Datentypen
-        g = g.copy()
-        v = v.copy()
-        g["Geb_Hoehe"] = pd.to_numeric(g["Geb_Hoehe"], errors="coerce")
-
-        # Nutzung normalisieren und nur Kfz-Flächen wählen
-        v["Nutzung_clean"] = v["Nutzung"].astype(str).str.lower().str.replace("_", "", regex=False)
-        kfz = v[v["Nutzung_clean"] == "kfzflaeche"]
-
-        if not kfz.empty:
-            # 10-m-Puffer um Kfz-Flächen, Gebäude in Nähe markieren
-            kfz_puffer_union = kfz.buffer(10).unary_union
-            g["an_kfz"] = g.intersects(kfz_puffer_union)
-
-            # Höhenvergleich (nahe Kfz vs. übrige)
-            hoehe_nahe = g.loc[g["an_kfz"], "Geb_Hoehe"].mean()
-            hoehe_fern = g.loc[~g["an_kfz"], "Geb_Hoehe"].mean()
-
-            if pd.notna(hoehe_nahe) and pd.notna(hoehe_fern):
-                if hoehe_nahe > hoehe_fern:
-                    k["K005"] = 2
-                elif hoehe_nahe == hoehe_fern:
-                    k["K005"] = 1
-                else:
-                    k["K005"] = 0
-            else:
-                k["K005"] = np.nan
-        else:
-            # Keine Kfz-Flächen identifiziert
-            k["K005"] = np.nan
-    else:
+def k004_einbettung(layers):
+    mittel_neu = layers.flaeche_mittel("Gebaeude")
+    mittel_umgebung = layers.flaeche_mittel("Gebaeude_Umgebung")
+    if mittel_neu is None or mittel_umgebung is None:
+        raise ValueError("Gebaeude oder Gebaeude_Umgebung fehlt.")
+
+    koernigkeit = mittel_neu / mittel_umgebung
+    if 0.75 <= koernigkeit <= 1.25:
+        return 2
+    elif 0.5 <= koernigkeit < 0.75 or 1.25 < koernigkeit <= 1.5:
+        return 1.5
+    return 1
+
+
+# K005 - Lärmschutz
+def k005_laermschutz(layers):
+    g = layers.get("Gebaeude")
+    v = layers.get("Verkehrsflaechen")
+
+    if g is None or v is None or "Geb_Hoehe" not in g.columns or "Nutzung" not in v.columns:
         # Fehlende Daten/Spalten
-        raise ValueError
-except Exception:
-    k["K005"] = np.nan
+        raise ValueError("Gebaeude/Verkehrsflaechen fehlt oder Felder 'Geb_Hoehe'/'Nutzung' fehlen.")
+
+    # Datentypen
+    hoehe = pd.to_numeric(g["Geb_Hoehe"], errors="coerce")
+
+    # Nutzung normalisieren und nur Kfz-Flächen wählen
+    kfz = v[layers.nutzung_maske("Verkehrsflaechen", "kfzflaeche", normalisiert=True)]
+
+    if kfz.empty:
+        # Keine Kfz-Flächen identifiziert
+        return np.nan
+
+    # 10-m-Puffer um Kfz-Flächen, Gebäude in Nähe markieren; Abfrage der
+    # einzelnen Puffer über den Raumindex statt gegen deren Vereinigung
+    kfz_puffer = kfz.buffer(10)
+    geb_idx, _ = kfz_puffer.sindex.query(g.geometry, predicate="intersects")
+    an_kfz = np.zeros(len(g), dtype=bool)
+    an_kfz[geb_idx] = True
+
+    # Höhenvergleich (nahe Kfz vs. übrige)
+    hoehe_nahe = hoehe[an_kfz].mean()
+    hoehe_fern = hoehe[~an_kfz].mean()
+
+    if pd.notna(hoehe_nahe) and pd.notna(hoehe_fern):
+        if hoehe_nahe > hoehe_fern:
+            return 2
+        elif hoehe_nahe == hoehe_fern:
+            return 1
+        return 0
+    return np.nan
 
 
 # K006 - Erhalt Bestandsgebaeude
-try:
-    gebaeude = get("Gebaeude")
-    gebaeude_bestand = get("Gebaeude_Umgebung")
-    gebietsgrenze = get("Gebietsabgrenzung")
-    if gebaeude is not None and gebaeude_bestand is not None and gebietsgrenze is not None:
-        bestand_clip = gpd.clip(gebaeude_bestand, gebietsgrenze)
-        g_poly = gebaeude[gebaeude.geometry.type.isin(["Polygon", "MultiPolygon"])].copy()
-        bestand_poly = bestand_clip[bestand_clip.geometry.type.isin(["Polygon", "MultiPolygon"])].copy()
-        bestand_poly = bestand_poly.reset_index(drop=False).rename(columns={"index": "bestand_id"})
-        bestand_poly["geometry"] = bestand_poly.geometry.buffer(0.20)
-        ueberlappung = gpd.overlay(g_poly, bestand_poly, how="intersection", keep_geom_type=False)
-        anzahl_neu = g_poly.shape[0]
-        anzahl_ueberlappt = ueberlappung["bestand_id"].nunique()
-        k["K006"] = round(min(anzahl_ueberlappt / anzahl_neu, 1), 2) if anzahl_neu > 0 else np.nan
-    else:
-        raise ValueError
-except:
-    k["K006"] = np.nan
-    
+def k006_erhalt_bestandsgebaeude(layers):
+    g_poly = layers.polygone("Gebaeude")
+    gebaeude_bestand = layers.get("Gebaeude_Umgebung")
+    gebietsgrenze = layers.get("Gebietsabgrenzung")
+    if g_poly is None or gebaeude_bestand is None or gebietsgrenze is None:
+        raise ValueError("Gebaeude, Gebaeude_Umgebung oder Gebietsabgrenzung fehlt.")
+
+    PUFFER = 0.20
+    anzahl_neu = g_poly.shape[0]
+    if anzahl_neu == 0:
+        return np.nan
+
+    # Nur Bestandsgebäude, deren Ausdehnung im Umkreis von 0,20 m um ein neues
+    # Gebäude liegt, werden überhaupt zugeschnitten (Umgebung reicht oft weit übers Gebiet)
+    b = g_poly.geometry[~g_poly.geometry.is_empty].bounds
+    suchfenster = shapely.box(b.minx - PUFFER, b.miny - PUFFER, b.maxx + PUFFER, b.maxy + PUFFER)
+    nah = np.unique(gebaeude_bestand.sindex.query(suchfenster)[1])
+    bestand_clip = gpd.clip(gebaeude_bestand.iloc[nah], gebietsgrenze)
+    bestand_poly = bestand_clip[bestand_clip.geometry.type.isin(POLYGON_TYPEN)]
+
+    # Anzahl der Bestandsgebäude (gepuffert), die ein neues Gebäude berühren;
+    # Prädikatabfrage über den Raumindex, ohne Schnittgeometrien zu bilden
+    bestand_puffer = bestand_poly.geometry.buffer(PUFFER)
+    treffer = bestand_puffer.sindex.query(g_poly.geometry, predicate="intersects")[1]
+    anzahl_ueberlappt = len(np.unique(treffer))
+    return round(min(anzahl_ueberlappt / anzahl_neu, 1), 2)
+
 
 # K007 - energetische Standards: Anteil PV-Anlagen
-try:
-    g = get("Gebaeude")
-    pv = get("PV_Anlage")
-    if g is not None and pv is not None:
-        flaeche_gesamt = g.geometry.area.sum()
-        flaeche_pv = pv.geometry.area.sum()
-        k["K007"] = round(flaeche_pv / flaeche_gesamt, 2) if flaeche_gesamt > 0 else np.nan
-    else:
-        raise ValueError
-except:
-    k["K007"] = np.nan
-    
+def k007_pv_anteil(layers):
+    flaeche_gesamt = layers.flaeche_summe("Gebaeude")
+    flaeche_pv = layers.flaeche_summe("PV_Anlage")
+    if flaeche_gesamt is None or flaeche_pv is None:
+        raise ValueError("Gebaeude oder PV_Anlage fehlt.")
+
+    return round(flaeche_pv / flaeche_gesamt, 2) if flaeche_gesamt > 0 else np.nan
+
 
 # K008 - Nutzungsvielfalt Freiflaechen
-try:
-    oeff = get("oeffentliche_Gruenflaechen")
-    plaetze = get("oeffentliche_Plaetze")
+def k008_nutzungsvielfalt(layers):
+    oeff = layers.get("oeffentliche_Gruenflaechen")
+    plaetze = layers.get("oeffentliche_Plaetze")
 
     kategorien = set()
 
@@ -211,165 +628,374 @@ try:
     platz_bonus = 1 if (plaetze is not None and not plaetze.empty) else 0
 
     gesamt = len(kategorien) + platz_bonus
-    k["K008"] = gesamt if gesamt > 0 else np.nan
+    return gesamt if gesamt > 0 else np.nan
 
-except Exception:
-    k["K008"] = np.nan
-    
 
-# K009 - Zugang zum Wasser 
-try:
-    wasser  = get("Wasser")
-    oeff    = get("oeffentliche_Gruenflaechen")
-    plaetze = get("oeffentliche_Plaetze")
+# K009 - Zugang zum Wasser
+def k009_zugang_wasser(layers):
+    wasser  = layers.get("Wasser")
+    oeff    = layers.get("oeffentliche_Gruenflaechen")
+    plaetze = layers.get("oeffentliche_Plaetze")
 
-    if wasser is not None and not wasser.empty:
-        access_layers = [gdf for gdf in (oeff, plaetze) if gdf is not None and not gdf.empty]
+    if wasser is None or wasser.empty:
+        # Kein Wasser im Gebiet
+        return 0
 
-        if access_layers:
-            geoms = pd.concat([gdf.geometry for gdf in access_layers], ignore_index=True)
-            access_union = geoms.union_all() if hasattr(geoms, "union_all") else geoms.unary_union
-            access_buf = access_union.buffer(2)
+    access_layers = [gdf for gdf in (oeff, plaetze) if gdf is not None and not gdf.empty]
+    if not access_layers:
+        # Wasser vorhanden, aber keine öffentlichen Zugangsflächen
+        return 1
 
-            # Wasser an öffentlichen Grünflächen/Plätzen (mit 2 m Puffer) erlebbar?
-            is_accessible = wasser.intersects(access_buf).any()
-            k["K009"] = 2 if is_accessible else 1
-        else:
-            # Wasser vorhanden, aber keine öffentlichen Zugangsflächen
-            k["K009"] = 1
-    else:
-        # Kein Wasser im Gebiet
-        k["K009"] = 0
-except Exception:
-    k["K009"] = np.nan
+    geoms = pd.concat([gdf.geometry for gdf in access_layers], ignore_index=True)
+    access_union = geoms.union_all() if hasattr(geoms, "union_all") else geoms.unary_union
+    access_buf = access_union.buffer(2)
+
+    # Wasser an öffentlichen Grünflächen/Plätzen (mit 2 m Puffer) erlebbar?
+    is_accessible = wasser.intersects(access_buf).any()
+    return 2 if is_accessible else 1
 
 
 # K010 - Entsiegelung
-try:
-    alt  = get("Bestandsgruen")
-    oeff = get("oeffentliche_Gruenflaechen")
-    priv = get("private_Gruenflaechen")
-
-    if not (gebietsflaeche and gebietsflaeche > 0):
-        k["K010"] = np.nan
-    else:
-        neu_gruen = (
-            (oeff.geometry.area.sum() if oeff is not None else 0.0) +
-            (priv.geometry.area.sum() if priv is not None else 0.0)
-        )
+def k010_entsiegelung(layers):
+    alt  = layers.get("Bestandsgruen")
 
-        if alt is None:
-            # Layer fehlt -> Zero-Fill (kein Bonus)
-            k["K010"] = 0.0
-        elif alt.empty:
-            # Layer existiert, aber leer -> Anteil der neuen Grünflächen (ohne Wasser)
-            k["K010"] = round(neu_gruen / gebietsflaeche, 2)
-        else:
-            # Klassische Differenz neu(ohne Wasser) - alt
-            altf = alt.geometry.area.sum()
-            k["K010"] = round((neu_gruen - altf) / gebietsflaeche, 2)
-except Exception:
-    k["K010"] = np.nan
+    gebiet = layers.gebietsflaeche()
+    if not (gebiet and gebiet > 0):
+        return np.nan
 
+    neu_gruen = (
+        (layers.flaeche_summe("oeffentliche_Gruenflaechen") or 0.0) +
+        (layers.flaeche_summe("private_Gruenflaechen") or 0.0)
+    )
 
-# K011 - Rettungswege, Mindestwegbreite
-try:
-    ml = get("Verkehrsmittellinie")
-    g  = get("Gebaeude")
-    go = get("oeffentliche_Gruenflaechen")
-    gp = get("private_Gruenflaechen")
-    pl = get("oeffentliche_Plaetze") 
-
-    if ml is None or ml.empty:
-        k["K011"] = np.nan
-    else:
-        def only_polys(df):
-            if df is None or df.empty:
-                return None
-            df = df[df.geometry.notna()].copy()
-            df = df[df.geometry.type.isin(["Polygon", "MultiPolygon"])]
-            if not df.empty:
-                df["geometry"] = df.geometry.buffer(0)  # Invalids reparieren
-            return df
-
-        parts = []
-        for df in (g, go, gp, pl):
-            p = only_polys(df)
-            if p is not None and not p.empty:
-                parts.append(p[["geometry"]])
-
-        if not parts:
-            k["K011"] = 1
-        else:
-            blockers = gpd.GeoDataFrame(
-                pd.concat(parts, ignore_index=True),
-                geometry="geometry",
-                crs=get("Verkehrsmittellinie").crs if hasattr(ml, "crs") else None
-            )
-
-            # 3-m-Korridor (±1.5 m) um Mittellinien
-            corridors = ml.geometry.buffer(1.5).buffer(0)
-            try:
-                from shapely import union_all
-                corridor_u = union_all(corridors)
-            except Exception:
-                corridor_u = corridors.unary_union
+    if alt is None:
+        # Layer fehlt -> Zero-Fill (kein Bonus)
+        return 0.0
+    elif layers.anzahl("Bestandsgruen") == 0:
+        # Layer existiert, aber leer -> Anteil der neuen Grünflächen (ohne Wasser)
+        return round(neu_gruen / gebiet, 2)
+    # Klassische Differenz neu(ohne Wasser) - alt
+    altf = layers.flaeche_summe("Bestandsgruen")
+    return round((neu_gruen - altf) / gebiet, 2)
 
-            cgdf = gpd.GeoDataFrame(geometry=[corridor_u], crs=ml.crs if hasattr(ml, "crs") else None)
 
-            # Exakte Schnittflächen
-            MIN_OVERLAP_M2 = 0.01
-            mask = blockers.intersects(corridor_u)
-            if mask.any():
-                inter = gpd.overlay(blockers.loc[mask], cgdf, how="intersection", keep_geom_type=False)
-                inter["area_m2"] = inter.geometry.area
-                has_overlap = (inter["area_m2"] > MIN_OVERLAP_M2).any()
-            else:
-                has_overlap = False
-
-            k["K011"] = 0 if has_overlap else 1
-except Exception:
-    k["K011"] = np.nan
+# K011 - Rettungswege, Mindestwegbreite
+KORRIDOR_HALBBREITE = 1.5   # 3-m-Korridor (±1.5 m) um Mittellinien
+MIN_OVERLAP_M2 = 0.01
+HINDERNIS_LAYER = ("Gebaeude", "oeffentliche_Gruenflaechen", "private_Gruenflaechen", "oeffentliche_Plaetze")
+KANDIDATEN_JE_BLOCK = 256
+
+
+def rettungsweg_konflikte(layers, alle=True):
+    """Hindernisse im Rettungsweg-Korridor um die Verkehrsmittellinien.
+
+    Jedes Mittellinien-Segment erhält einen eigenen Korridor; Hindernisse
+    (``Vorberechnung.gueltige_polygone``) werden über ihre Raumindizes nur
+    gegen benachbarte Korridore geprüft und Schnittflächen nur für diese
+    Kandidatenpaare berechnet. Liefert ``None``
+    ohne Mittellinien, sonst eine Liste von Konflikten (Segment-ID,
+    Hindernis-Layer und -ID, Überlappungsfläche, Lage als x/y im Layer-CRS
+    sowie lon/lat). Mit ``alle=False`` endet die Suche beim ersten Block von
+    Kandidaten, der einen Konflikt enthält.
+    """
+    layers = Vorberechnung.von(layers)
+    if layers.korridore() is None:
+        return None
+    segment_ids, korridore, _ = layers.korridore()
+
+    # Hindernisse (repariert) und Kandidatenpaare (Hindernis, Korridor) über die
+    # Raumindizes der Hindernis-Layer, nach Hindernis sortiert
+    namen, ids, geometrien, h_teile, k_teile = [], [], [], [], []
+    for layer_name in HINDERNIS_LAYER:
+        geoms = layers.gueltige_polygone(layer_name)
+        if geoms is None or geoms.empty:
+            continue
+        k_i, h_i = layers.raumindex(layer_name).query(korridore)
+        h_teile.append(h_i + len(ids))
+        k_teile.append(k_i)
+        namen += [layer_name] * len(geoms)
+        ids += list(geoms.index)
+        geometrien.append(np.asarray(geoms.values))
+    if not geometrien:
+        return []
+    hindernisse = np.concatenate(geometrien)
+    h_idx, k_idx = np.concatenate(h_teile), np.concatenate(k_teile)
+    reihenfolge = np.lexsort((k_idx, h_idx))
+    h_idx, k_idx = h_idx[reihenfolge], k_idx[reihenfolge]
+
+    konflikte = []
+    kandidaten = np.unique(h_idx)
+    for blockstart in range(0, len(kandidaten), KANDIDATEN_JE_BLOCK):
+        block = kandidaten[blockstart:blockstart + KANDIDATEN_JE_BLOCK]
+        von = np.searchsorted(h_idx, block[0], side="left")
+        bis = np.searchsorted(h_idx, block[-1], side="right")
+        pos, ki = np.searchsorted(block, h_idx[von:bis]), k_idx[von:bis]
+
+        kandidat = hindernisse[block]
+        schnitte = shapely.intersection(kandidat[pos], korridore[ki])
+        flaechen = shapely.area(schnitte)
+
+        def konflikt(b, k, schnitt, flaeche):
+            punkt = shapely.point_on_surface(schnitt)
+            return {"segment": segment_ids[k], "layer": namen[block[b]], "id": ids[block[b]],
+                    "flaeche_m2": float(flaeche), "x": float(shapely.get_x(punkt)), "y": float(shapely.get_y(punkt))}
+
+        for j in np.flatnonzero(flaechen > MIN_OVERLAP_M2):
+            konflikte.append(konflikt(pos[j], ki[j], schnitte[j], flaechen[j]))
+
+        # Sonderfall: ein Hindernis ragt in mehrere Korridore, jeweils knapp unter der
+        # Schwelle -> Fläche gegen die Vereinigung dieser Korridore prüfen
+        summe = np.bincount(pos, weights=flaechen, minlength=len(block))
+        maximum = np.zeros(len(block))
+        np.maximum.at(maximum, pos, flaechen)
+        for b in np.flatnonzero((maximum <= MIN_OVERLAP_M2) & (summe > MIN_OVERLAP_M2)):
+            paare = np.flatnonzero(pos == b)
+            schnitt = shapely.intersection(kandidat[b], shapely.union_all(korridore[ki[paare]]))
+            if shapely.area(schnitt) > MIN_OVERLAP_M2:
+                k = ki[paare[np.argmax(flaechen[paare])]]
+                konflikte.append(konflikt(b, k, schnitt, shapely.area(schnitt)))
+
+        if konflikte and not alle:
+            break
+
+    crs = layers.get("Verkehrsmittellinie").crs
+    if alle and konflikte and crs is not None:
+        nach_wgs84 = Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
+        for k, (lon, lat) in zip(konflikte, nach_wgs84.itransform((k["x"], k["y"]) for k in konflikte)):
+            k["lon"], k["lat"] = lon, lat
+    return konflikte
+
+
+def k011_rettungswege(layers):
+    konflikte = rettungsweg_konflikte(layers, alle=False)
+    if konflikte is None:
+        return np.nan
+    return 0 if konflikte else 1
 
 
 # K012 - Anteil Dachbegruenung
-try:
-    dach = get("Dachgruen")
-    g = get("Gebaeude")
-    if g is not None and dach is not None:
-        flaeche_gesamt = g.geometry.area.sum()
-        flaeche_dach = dach.geometry.area.sum()
-        k["K012"] = round(flaeche_dach / flaeche_gesamt, 2) if flaeche_gesamt > 0 else np.nan
-    else:
-        raise ValueError
-except:
-    k["K012"] = np.nan
-    
+def k012_dachbegruenung(layers):
+    flaeche_gesamt = layers.flaeche_summe("Gebaeude")
+    flaeche_dach = layers.flaeche_summe("Dachgruen")
+    if flaeche_gesamt is None or flaeche_dach is None:
+        raise ValueError("Gebaeude oder Dachgruen fehlt.")
+
+    return round(flaeche_dach / flaeche_gesamt, 2) if flaeche_gesamt > 0 else np.nan
+
 
 # K013 - Erhalt Baumbestand
-try:
-    neu = get("Baeume_Entwurf")
-    alt = get("Bestandsbaeume")
-    if neu is not None and alt is not None and not neu.empty and not alt.empty:
-        preserved = gpd.sjoin_nearest(neu, alt, how="left", max_distance=1, distance_col="dist")
-        anzahl = preserved.dropna(subset=["dist"]).shape[0]
-        k["K013"] = round(anzahl / neu.shape[0], 2)
-    else:
-        raise ValueError
-except:
-    k["K013"] = np.nan
-    
+BAUM_TOLERANZ = 1.0   # max. Abstand [m], in dem ein Entwurfsbaum einen Bestandsbaum erhält
+
+
+def erhaltene_baeume(neu, alt, toleranz=BAUM_TOLERANZ):
+    """Größte Eins-zu-eins-Zuordnung von Entwurfs- zu Bestandsbäumen im Abstand ``toleranz``.
+
+    Kandidatenpaare kommen aus einer einzigen ``dwithin``-Abfrage gegen den
+    Raumindex der Bestandsbäume; die Zuordnung selbst ist ein maximales
+    bipartites Matching (Hopcroft-Karp). Jeder Bestandsbaum erhält also
+    höchstens einen Entwurfsbaum und umgekehrt. Liefert je Entwurfsbaum die
+    Position des zugeordneten Bestandsbaums oder -1.
+    """
+    neu_geom = neu.geometry.values
+    alt_geom = alt.geometry.values
+    gueltig_neu = ~(neu_geom.isna() | neu_geom.is_empty)
+    gueltig_alt = ~(alt_geom.isna() | alt_geom.is_empty)
+    zuordnung = np.full(len(neu), -1)
+    if not gueltig_neu.any() or not gueltig_alt.any():
+        return zuordnung
+
+    idx_neu = np.flatnonzero(gueltig_neu)
+    idx_alt = np.flatnonzero(gueltig_alt)
+    baum = shapely.STRtree(alt_geom[idx_alt])
+    i, j = baum.query(neu_geom[idx_neu], predicate="dwithin", distance=toleranz)
+    if len(i) == 0:
+        return zuordnung
+
+    paare = csr_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(len(idx_neu), len(idx_alt)))
+    treffer = maximum_bipartite_matching(paare, perm_type="column")
+    zugeordnet = treffer >= 0
+    zuordnung[idx_neu[zugeordnet]] = idx_alt[treffer[zugeordnet]]
+    return zuordnung
+
+
+def k013_erhalt_baumbestand(layers):
+    neu = layers.get("Baeume_Entwurf")
+    alt = layers.get("Bestandsbaeume")
+    if neu is None or alt is None or neu.empty or alt.empty:
+        raise ValueError("Baeume_Entwurf oder Bestandsbaeume fehlt bzw. ist leer.")
+
+    anzahl = int((erhaltene_baeume(neu, alt) >= 0).sum())
+    return round(anzahl / neu.shape[0], 2)
+
 
 # K015 - Zonierung Freiflaechen
-try:
-    hat_oeff = get("oeffentliche_Gruenflaechen") is not None and not get("oeffentliche_Gruenflaechen").empty
-    hat_priv = get("private_Gruenflaechen") is not None and not get("private_Gruenflaechen").empty
-    k["K015"] = 1 if hat_oeff and hat_priv else 0
-except:
-    k["K015"] = np.nan
-   
-# Endausgabe der Kriterienbewertung aller Kriterien
-df_kriterien = pd.DataFrame([k])
-df_kriterien.to_excel(os.path.join(projektpfad, "Kriterien_Ergebnisse.xlsx"), index=False)
+def k015_zonierung(layers):
+    oeff = layers.get("oeffentliche_Gruenflaechen")
+    priv = layers.get("private_Gruenflaechen")
+    hat_oeff = oeff is not None and not oeff.empty
+    hat_priv = priv is not None and not priv.empty
+    return 1 if hat_oeff and hat_priv else 0
+
+
+# Reihenfolge entspricht den Spalten der Bewertungsmatrix
+KRITERIEN = {
+    "K002": k002_mobilitaet,
+    "K003": k003_gruenflaechenanteil,
+    "K004": k004_einbettung,
+    "K005": k005_laermschutz,
+    "K006": k006_erhalt_bestandsgebaeude,
+    "K007": k007_pv_anteil,
+    "K008": k008_nutzungsvielfalt,
+    "K009": k009_zugang_wasser,
+    "K010": k010_entsiegelung,
+    "K011": k011_rettungswege,
+    "K012": k012_dachbegruenung,
+    "K013": k013_erhalt_baumbestand,
+    "K015": k015_zonierung,
+}
+
+# Von jedem Kriterium gelesene Layer; ändert sich keiner davon, bleibt der Wert gleich
+KRITERIUM_LAYER = {
+    "K002": ("Verkehrsflaechen",),
+    "K003": ("oeffentliche_Gruenflaechen", "private_Gruenflaechen", "Gebietsabgrenzung"),
+    "K004": ("Gebaeude", "Gebaeude_Umgebung"),
+    "K005": ("Gebaeude", "Verkehrsflaechen"),
+    "K006": ("Gebaeude", "Gebaeude_Umgebung", "Gebietsabgrenzung"),
+    "K007": ("Gebaeude", "PV_Anlage"),
+    "K008": ("oeffentliche_Gruenflaechen", "oeffentliche_Plaetze"),
+    "K009": ("Wasser", "oeffentliche_Gruenflaechen", "oeffentliche_Plaetze"),
+    "K010": ("Bestandsgruen", "oeffentliche_Gruenflaechen", "private_Gruenflaechen", "Gebietsabgrenzung"),
+    "K011": ("Verkehrsmittellinie",) + HINDERNIS_LAYER,
+    "K012": ("Gebaeude", "Dachgruen"),
+    "K013": ("Baeume_Entwurf", "Bestandsbaeume"),
+    "K015": ("oeffentliche_Gruenflaechen", "private_Gruenflaechen"),
+}
+
+
+def kriterium_schluessel(layer_hashes):
+    """Schlüssel je Kriterium aus den Hashes seiner Eingabe-Layer (siehe ``LayerCache.layer_hashes``)."""
+    schluessel = {}
+    for kriterium, namen in KRITERIUM_LAYER.items():
+        teile = [ENGINE_VERSION, kriterium] + [f"{name}={layer_hashes.get(name)}" for name in namen]
+        schluessel[kriterium] = hashlib.sha256("|".join(teile).encode()).hexdigest()
+    return schluessel
+
+
+def pruef_schluessel(layer_hashes):
+    """Schlüssel je Teil der Geometrie-Prüfung (``geometrie_pruefung.pruefteile``) aus den Hashes seiner Layer."""
+    schluessel = {}
+    for teil in geometrie_pruefung.pruefteile():
+        namen = [teil] if isinstance(teil, str) else teil
+        teile = [ENGINE_VERSION, "Geometrie"] + [f"{name}={layer_hashes.get(name)}" for name in namen]
+        schluessel[teil] = hashlib.sha256("|".join(teile).encode()).hexdigest()
+    return schluessel
+
+
+def benoetigte_layer(kriterien):
+    """Layer, die zur Berechnung von ``kriterien`` gelesen werden müssen (in ``layer_namen``-Reihenfolge)."""
+    namen = {name for kriterium in kriterien for name in KRITERIUM_LAYER[kriterium]}
+    return [name for name in layer_namen if name in namen]
 
 
+# --- Kriterien berechnen
+def compute_criteria(layers, profil=None, bekannt=None):
+    """Berechnet alle Kriterien K002–K015 für bereits geladene Layer.
+
+    Nicht berechenbare Kriterien (fehlende Layer/Attribute, Geometriefehler)
+    werden mit ``np.nan`` belegt. Mit einem ``Profil`` werden Laufzeit und
+    Fehlergrund je Kriterium festgehalten. Abgeleitete Geometriegrößen werden
+    über eine gemeinsame ``Vorberechnung`` nur einmal je Entwurf berechnet.
+    Werte in ``bekannt`` (z. B. aus einer früheren Version des Entwurfs mit
+    unveränderten Eingabe-Layern) werden übernommen statt neu berechnet.
+    """
+    profil = profil if profil is not None else Profil()
+    bekannt = bekannt or {}
+    layers = Vorberechnung.von(layers)
+    k = {}   # Dictionary für alle K-Werte
+    for kriterium, funktion in KRITERIEN.items():
+        if kriterium in bekannt:
+            k[kriterium] = bekannt[kriterium]
+            continue
+        try:
+            with profil.messen(kriterium, art="kriterium"):
+                k[kriterium] = funktion(layers)
+        except Exception:
+            k[kriterium] = np.nan
+    return k
+
+
+# --- Alle Layer einlesen und dabei Laufzeit und Feature-Anzahl je Layer messen
+def lade_alle(layers, profil, namen=layer_namen):
+    for name in namen:
+        with profil.messen(name, art="layer") as eintrag:
+            gdf = layers.get(name)
+            eintrag["features"] = None if gdf is None else len(gdf)
+            eintrag["fehler"] = layers.fehler.get(name)
+
+
+# --- Ergebnisse als kompaktes JSON (fehlende Werte -> null)
+def kriterien_als_json(k):
+    werte = {}
+    for kriterium, wert in k.items():
+        if pd.isna(wert):
+            werte[kriterium] = None
+        else:
+            werte[kriterium] = wert.item() if hasattr(wert, "item") else wert
+    return json.dumps(werte)
+
+
+def kriterien_aus_json(text):
+    werte = json.loads(text)
+    return {kriterium: (np.nan if wert is None else wert) for kriterium, wert in werte.items()}
+
+
+def speichere_kriterien(k, pfad):
+    with open(pfad, "w", encoding="utf-8") as f:
+        f.write(kriterien_als_json(k))
+
+
+def lade_kriterien(pfad):
+    with open(pfad, encoding="utf-8") as f:
+        return kriterien_aus_json(f.read())
+
+
+# --- Kommandozeile (kompatibel zum bisherigen Skriptaufruf)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Berechnet die Kriterien K002–K015 eines Entwurfs.")
+    parser.add_argument("projektpfad", nargs="?", default=".",
+                        help="Ordner oder ZIP-Datei mit den Shapefiles des Entwurfs")
+    parser.add_argument("--excel", action="store_true",
+                        help="zusätzlich Kriterien_Ergebnisse.xlsx schreiben (bisheriges Ausgabeformat)")
+    parser.add_argument("--profil", metavar="JSON", help="Laufzeitprofil als JSON-Datei schreiben")
+    parser.add_argument("--speicher", action="store_true", help="Speicherspitze je Stufe messen (langsamer)")
+    parser.add_argument("--layer-speicher", nargs="?", const=layer_speicher.SPEICHER_PFAD, metavar="ORDNER",
+                        help="gelesene Layer als Feather ablegen und wiederverwenden "
+                             f"(Standard-Ordner: {layer_speicher.SPEICHER_PFAD})")
+    parser.add_argument("--bereinigen", action="store_true",
+                        help="ungültige Geometrien reparieren und überlappende Flächen je Layer vereinigen")
+    args = parser.parse_args(argv)
+
+    profil = Profil(speicher=args.speicher)
+    speicher = layer_speicher.LayerSpeicher(args.layer_speicher) if args.layer_speicher else None
+    with LayerCache(args.projektpfad, speicher=speicher, bereinigen=args.bereinigen) as layers:
+        lade_alle(layers, profil)
+        vorberechnung = Vorberechnung(layers)
+        k = compute_criteria(vorberechnung, profil)
+        with profil.messen("Geometrie-Prüfung"):
+            bericht = geometrie_pruefung.pruefe_geometrien(vorberechnung)
+        for hinweis in geometrie_pruefung.hinweise(bericht):
+            warnings.warn(hinweis)
+
+    # Endausgabe der Kriterienbewertung aller Kriterien (bei ZIP-Dateien daneben)
+    ausgabeordner = args.projektpfad if os.path.isdir(args.projektpfad) else os.path.dirname(args.projektpfad)
+    speichere_kriterien(k, os.path.join(ausgabeordner, "Kriterien_Ergebnisse.json"))
+    if args.excel:
+        df_kriterien = pd.DataFrame([k])
+        df_kriterien.to_excel(os.path.join(ausgabeordner, "Kriterien_Ergebnisse.xlsx"), index=False)
+    if args.profil:
+        with open(args.profil, "w", encoding="utf-8") as f:
+            f.write(profil.als_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import itertools
+
+import numpy as np
+import geopandas as gpd
+import pytest
+from shapely.geometry import Point
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shpVerknuepfung as kriterien_engine  # noqa: E402
+
+
+CRS = "EPSG:25832"
+
+
+def baeume(punkte):
+    return gpd.GeoDataFrame(geometry=[None if p is None else Point(p) for p in punkte], crs=CRS)
+
+
+def erhalten(neu, alt):
+    return int((kriterien_engine.erhaltene_baeume(baeume(neu), baeume(alt)) >= 0).sum())
+
+
+def erhalten_brute_force(neu, alt, toleranz=kriterien_engine.BAUM_TOLERANZ):
+    """Größte Zuordnung durch Ausprobieren aller Zuordnungen (nur für wenige Bäume)."""
+    nah = [[Point(n).distance(Point(a)) <= toleranz for a in alt] for n in neu]
+    beste = 0
+    for auswahl in itertools.permutations(range(len(alt) + len(neu)), len(neu)):
+        beste = max(beste, sum(j < len(alt) and nah[i][j] for i, j in enumerate(auswahl)))
+    return beste
+
+
+def test_gleich_weit_entfernte_bestandsbaeume():
+    """Ein Entwurfsbaum mittig zwischen zwei Bestandsbäumen erhält nur einen davon."""
+    assert erhalten([(0, 0)], [(-0.8, 0), (0.8, 0)]) == 1
+    # der zweite Entwurfsbaum erreicht nur den rechten; die Zuordnung muss ihm diesen lassen
+    assert erhalten([(0, 0), (1.7, 0)], [(-0.8, 0), (0.8, 0)]) == 2
+
+
+def test_ein_bestandsbaum_fuer_zwei_entwurfsbaeume():
+    zuordnung = kriterien_engine.erhaltene_baeume(baeume([(-0.5, 0), (0.5, 0)]), baeume([(0, 0)]))
+    assert sorted(zuordnung.tolist()) == [-1, 0]
+
+
+def test_leere_und_fehlende_geometrien():
+    leer = gpd.GeoDataFrame(geometry=[Point(0, 0), Point()], crs=CRS)
+    assert kriterien_engine.erhaltene_baeume(leer, baeume([(0, 0.5)])).tolist() == [0, -1]
+    assert kriterien_engine.erhaltene_baeume(baeume([None, (5, 5)]), baeume([(5, 5.5), None])).tolist() == [-1, 0]
+    assert kriterien_engine.erhaltene_baeume(baeume([(0, 0)]), baeume([None])).tolist() == [-1]
+    assert kriterien_engine.erhaltene_baeume(baeume([None]), baeume([(0, 0)])).tolist() == [-1]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_wie_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    neu = [tuple(p) for p in rng.uniform(0, 3, (rng.integers(1, 5), 2))]
+    alt = [tuple(p) for p in rng.uniform(0, 3, (rng.integers(1, 5), 2))]
+    zuordnung = kriterien_engine.erhaltene_baeume(baeume(neu), baeume(alt))
+    zugeordnet = zuordnung[zuordnung >= 0]
+    assert len(set(zugeordnet)) == len(zugeordnet)
+    assert all(Point(neu[i]).distance(Point(alt[j])) <= kriterien_engine.BAUM_TOLERANZ
+               for i, j in enumerate(zuordnung) if j >= 0)
+    assert len(zugeordnet) == erhalten_brute_force(neu, alt)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import geopandas as gpd
+from shapely.geometry import Polygon, box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geometrie_pruefung  # noqa: E402
+
+
+CRS = "EPSG:25832"
+
+
+def test_bereinige_ohne_attributspalte():
+    """Fehlt eine der ``spalten`` im Layer, werden Überlappungen trotzdem vereinigt."""
+    gdf = gpd.GeoDataFrame(geometry=[box(0, 0, 10, 10), box(5, 0, 15, 10), box(20, 0, 30, 10)], crs=CRS)
+    bereinigt, statistik = geometrie_pruefung.bereinige(gdf, ["Geb_Hoehe"])
+    assert statistik["vereinigt"] == 1
+    assert len(bereinigt) == 2
+    assert bereinigt.geometry.area.sum() == 250
+
+
+def test_bereinige_nach_attributen():
+    """Überlappende Features mit verschiedenen Attributwerten bleiben getrennt."""
+    gdf = gpd.GeoDataFrame({"Nutzung": ["Park", "Park", "Sport"]},
+                           geometry=[box(0, 0, 10, 10), box(5, 0, 15, 10), box(12, 0, 20, 10)], crs=CRS)
+    bereinigt, statistik = geometrie_pruefung.bereinige(gdf, ["Nutzung"])
+    assert statistik["vereinigt"] == 1
+    assert list(bereinigt["Nutzung"]) == ["Park", "Sport"]
+
+
+def test_bereinige_behaelt_alle_teile_ungueltiger_flaechen():
+    """Eine Achterschleife wird zu beiden Dreiecken repariert, reine Linien entfallen."""
+    achterschleife = Polygon([(0, 0), (10, 10), (10, 0), (0, 10)])
+    strich = Polygon([(0, 20), (10, 20), (5, 20)])
+    gdf = gpd.GeoDataFrame(geometry=[achterschleife, strich], crs=CRS)
+    bereinigt, statistik = geometrie_pruefung.bereinige(gdf)
+    assert statistik == {"repariert": 2, "entfernt": 1, "vereinigt": 0}
+    assert bereinigt.geometry.area.tolist() == [50.0]
+    assert bereinigt.geometry.geom_type.tolist() == ["MultiPolygon"]
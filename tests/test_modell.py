@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modell  # noqa: E402
+import sensitivitaet  # noqa: E402
+
+
+def zeilen(feature_order, rf_model, anzahl=2000, seed=0):
+    """Feste Testzeilen: Zufallswerte aus den Wertebereichen, genau auf Schwellen gesetzte Werte und NaN."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({k: rng.choice(sensitivitaet.achse(k), anzahl) for k in feature_order})
+
+    # Gleichstand: Werte exakt auf den (wie beim Vorhersagen float32-gerundeten) Schwellen der Bäume
+    for baum in rf_model.estimators_:
+        innen = baum.tree_.feature >= 0
+        for merkmal, schwelle in zip(baum.tree_.feature[innen], baum.tree_.threshold[innen]):
+            X.iloc[rng.integers(anzahl), merkmal] = float(np.float32(schwelle))
+
+    X = X.mask(rng.random(X.shape) < 0.05)
+    X.iloc[0] = np.nan
+    return X
+
+
+def test_array_wald_wie_sklearn():
+    """Der ausgelieferte Baum-Export gehört zur Modelldatei und sagt exakt wie scikit-learn voraus."""
+    wald, feature_order = modell.lade_modell()
+    rf_model, sklearn_order = modell.lade_modell(kompakt=False)
+    assert isinstance(wald, modell.ArrayWald), "Baum-Export fehlt oder passt nicht zur Modelldatei"
+    assert feature_order == sklearn_order
+    assert list(wald.classes_) == list(rf_model.classes_)
+
+    X = zeilen(feature_order, rf_model)
+    np.testing.assert_array_equal(wald.predict_proba(X), rf_model.predict_proba(X))
+    np.testing.assert_array_equal(wald.predict(X), rf_model.predict(X))
+    np.testing.assert_array_equal(modell.baum_stimmen(wald, X), modell.baum_stimmen(rf_model, X))
@@ -0,0 +1,94 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pytest
+from shapely import affinity
+from shapely.geometry import LineString, box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shpVerknuepfung as kriterien_engine  # noqa: E402
+
+
+CRS = "EPSG:25832"
+
+
+def k011_overlay(layers):
+    """K011 wie in der ursprünglichen Fassung: Hindernisse gegen die Vereinigung aller Korridore per Overlay."""
+    ml = layers["Verkehrsmittellinie"]
+    teile = []
+    for name in kriterien_engine.HINDERNIS_LAYER:
+        df = layers.get(name)
+        if df is None or df.empty:
+            continue
+        df = df[df.geometry.type.isin(["Polygon", "MultiPolygon"])].copy()
+        df["geometry"] = df.geometry.buffer(0)
+        teile.append(df[["geometry"]])
+    if not teile:
+        return 1
+    hindernisse = gpd.GeoDataFrame(pd.concat(teile, ignore_index=True), geometry="geometry", crs=ml.crs)
+    korridor = ml.geometry.buffer(kriterien_engine.KORRIDOR_HALBBREITE).buffer(0).unary_union
+    maske = hindernisse.intersects(korridor)
+    if not maske.any():
+        return 1
+    schnitt = gpd.overlay(hindernisse.loc[maske], gpd.GeoDataFrame(geometry=[korridor], crs=ml.crs),
+                          how="intersection", keep_geom_type=False)
+    return 0 if (schnitt.geometry.area > kriterien_engine.MIN_OVERLAP_M2).any() else 1
+
+
+def entwurf(mittellinien, hindernisse):
+    return {
+        "Verkehrsmittellinie": gpd.GeoDataFrame(geometry=mittellinien, crs=CRS),
+        "Gebaeude": gpd.GeoDataFrame({"Geb_Hoehe": [10.0] * len(hindernisse)}, geometry=hindernisse, crs=CRS),
+    }
+
+
+def hindernis_am_korridorende(rng):
+    """Kleines gedrehtes Quadrat vor dem Ende einer Mittellinie, Überlappung nahe MIN_OVERLAP_M2.
+
+    Der Abstand zum Linienende wird per Bisektion so gewählt, dass die
+    Schnittfläche mit dem Korridor der Overlay-Fassung um höchstens 5 % von
+    der Schwelle abweicht; dort wirkt sich die Auflösung der Kreisbögen aus.
+    """
+    mittellinie = LineString([(0, 0), (20, 0)])
+    korridor = mittellinie.buffer(kriterien_engine.KORRIDOR_HALBBREITE, quad_segs=16)
+    winkel = rng.uniform(-np.pi / 2.2, np.pi / 2.2)
+    quadrat = affinity.rotate(box(-0.25, -0.25, 0.25, 0.25), rng.uniform(0, 90))
+    ziel = kriterien_engine.MIN_OVERLAP_M2 * rng.uniform(0.95, 1.05)
+
+    def an(abstand):
+        return affinity.translate(quadrat, 20 + abstand * np.cos(winkel), abstand * np.sin(winkel))
+
+    nah, fern = 1.0, 2.5
+    for _ in range(40):
+        mitte = (nah + fern) / 2
+        if an(mitte).intersection(korridor).area > ziel:
+            nah = mitte
+        else:
+            fern = mitte
+    return mittellinie, an((nah + fern) / 2)
+
+
+def test_k011_wie_overlay_an_korridorenden():
+    rng = np.random.default_rng(0)
+    abweichungen = []
+    for fall in range(300):
+        mittellinie, hindernis = hindernis_am_korridorende(rng)
+        layers = entwurf([mittellinie], [hindernis])
+        if kriterien_engine.k011_rettungswege(layers) != k011_overlay(layers):
+            abweichungen.append(fall)
+    assert abweichungen == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_k011_wie_overlay_zufaellige_entwuerfe(seed):
+    rng = np.random.default_rng(seed)
+    mittellinien = [LineString(rng.uniform(0, 200, (3, 2))) for _ in range(6)]
+    hindernisse = [box(x, y, x + w, y + h) for x, y, w, h in
+                   zip(*rng.uniform(0, 200, (2, 80)), *rng.uniform(0.2, 8, (2, 80)))]
+    for n in (1, 10, 80):
+        layers = entwurf(mittellinien, hindernisse[:n])
+        assert kriterien_engine.k011_rettungswege(layers) == k011_overlay(layers)